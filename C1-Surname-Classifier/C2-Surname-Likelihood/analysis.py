@@ -1,70 +1,105 @@
 import sys
 import os
+from collections import Counter
+from functools import lru_cache
 
-# Add src directory to path to import utils
-sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+# Use the installed package if there is one (pip install -e ..),
+# otherwise fall back to the src directory next to this folder
+try:
+    import surname_classifier
+except ImportError:
+    sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
 
 import numpy as np
-from collections import defaultdict
-import math
-from utils import load_data, split_by_language
+from surname_classifier.bigram_lm import BigramLM
+from surname_classifier.completion import Completer
+from surname_classifier.count_store import CountStore
+from surname_classifier.trie import NgramTrie
+from surname_classifier.utils import (
+    load_data, split_by_language, compute_frequencies, compute_frequencies_stream
+)
+
+UNSEEN_PROB = 1e-10
 
 def train_bigram_model(names):
     """
     Trains a character-level bigram model.
     Returns:
-        prob_matrix: A dictionary of dictionaries where prob_matrix[char1][char2] = P(char2 | char1)
+        A BigramLM whose log_probs[char1, char2] = log P(char2 | char1)
     """
-    bigram_counts = defaultdict(lambda: defaultdict(int))
-    unigram_counts = defaultdict(int)
-    
     # Add start and end tokens
-    processed_names = ["^" + name.lower() + "$" for name in names]
-    
-    for name in processed_names:
-        for i in range(len(name) - 1):
-            char1 = name[i]
-            char2 = name[i+1]
-            bigram_counts[char1][char2] += 1
-            unigram_counts[char1] += 1
-            
-    # Convert counts to probabilities logic
-    # P(char2 | char1) = count(char1, char2) / count(char1)
-    prob_matrix = defaultdict(dict)
-    
-    for char1, following_chars in bigram_counts.items():
-        total_count = unigram_counts[char1]
-        for char2, count in following_chars.items():
-            prob_matrix[char1][char2] = count / total_count
-            
-    return prob_matrix
+    return train_bigram_model_from_counts(compute_frequencies(names, n=2, pad=True))
+
+def train_bigram_model_stream(batches):
+    """
+    Same as train_bigram_model, but consumes an iterable of name batches
+    (e.g. utils.iter_names) so the corpus never has to fit in memory.
+    """
+    return train_bigram_model_from_counts(compute_frequencies_stream(batches, n=2, pad=True))
+
+def train_bigram_model_from_counts(counts):
+    """
+    Builds the model from padded ("^name$") bigram counts.
+    P(char2 | char1) = count(char1, char2) / count(char1); unseen bigrams get
+    a very small probability (smoothing could be used here, but for now strict)
+    """
+    return BigramLM.from_counts(counts, k=0.0, pad=True, unseen=UNSEEN_PROB)
+
+def load_bigram_model(path):
+    """
+    Builds the model from a padded bigram count store, e.g. one written by
+    count_store.build_count_store(path, names, n=2, pad=True).
+    """
+    return train_bigram_model_from_counts(CountStore(path))
 
 def calculate_likelihood(model, name):
     """
     Calculates the likelihood and log-likelihood of a name using the bigram model.
     """
     name_processed = "^" + name.lower() + "$"
-    log_likelihood = 0
-    probability = 1.0
-    
-    path_details = []
-    
-    for i in range(len(name_processed) - 1):
-        char1 = name_processed[i]
-        char2 = name_processed[i+1]
-        
-        if char1 in model and char2 in model[char1]:
-            prob = model[char1][char2]
-        else:
-            # Handle unseen bigrams with a very small probability (smoothing could be used here, but for now strict)
-            prob = 1e-10 
-            
-        probability *= prob
-        log_likelihood += math.log(prob)
-        path_details.append(f"P({char2}|{char1})={prob:.4f}")
+    log_probs = model.transition_log_probs(name)
+    probs = np.exp(log_probs)
+
+    probability = float(np.prod(probs))
+    log_likelihood = float(log_probs.sum())
+    path_details = [
+        f"P({char2}|{char1})={prob:.4f}"
+        for char1, char2, prob in zip(name_processed, name_processed[1:], probs)
+    ]
         
     return probability, log_likelihood, path_details
 
+def calculate_likelihoods(model, names):
+    """
+    Vectorized calculate_likelihood over many names at once.
+    Returns:
+        (probabilities, log_likelihoods) as arrays aligned with names
+    """
+    log_likelihoods = model.score_batch(names)
+    return np.exp(log_likelihoods), log_likelihoods
+
+@lru_cache(maxsize=8)
+def _successors(model, version):
+    """
+    Most likely next character after each character, looked up in an
+    NgramTrie of the model's bigram counts. Ties go to the character first
+    in the model's alphabet, as argmax over log_probs would pick. version
+    keys the cache so an updated model gets fresh successors.
+    """
+    counts = np.asarray(model.counts)
+    chars = model.alphabet.chars
+    trie = NgramTrie.from_counts(Counter({
+        chars[i] + chars[j]: int(counts[i, j])
+        for i, j in zip(*np.nonzero(counts))
+    }))
+    successors = {}
+    for char in chars:
+        continuations = trie.continuations(char)
+        if continuations:
+            successors[char] = max(continuations, key=lambda c: (
+                continuations[c], -model.alphabet.index(c)))
+    return successors
+
 def generate_completion(model, prefix):
     """
     Completes a name given a prefix using the most likely next character.
@@ -75,17 +110,13 @@ def generate_completion(model, prefix):
     # Check if the prefix itself is valid (should start with start token logic implicitly)
     # But here we just continue from the last character
     
+    successors = _successors(model, model.version)
     max_len = 20
     while len(current_name) < max_len:
-        if current_char not in model:
-            break
-            
         # Greedily choose the most likely next character
-        next_chars_probs = model[current_char]
-        if not next_chars_probs:
+        best_next_char = successors.get(current_char)
+        if best_next_char is None:
             break
-            
-        best_next_char = max(next_chars_probs, key=next_chars_probs.get)
         
         if best_next_char == '$':
             break
@@ -95,6 +126,17 @@ def generate_completion(model, prefix):
         
     return current_name
 
+@lru_cache(maxsize=8)
+def _completer(model):
+    return Completer(model)
+
+def generate_completions(model, prefix, k=3):
+    """
+    Returns the k most likely (completion, log-probability) pairs for a prefix,
+    found by beam search starting from the ^ start context.
+    """
+    return _completer(model).complete(prefix, k)
+
 def main():
     names, labels = load_data()
     english_names, _ = split_by_language(names, labels)
@@ -113,8 +155,8 @@ def main():
     print("-" * 55)
     
     results = []
-    for name in test_names:
-        prob, log_prob, _ = calculate_likelihood(model, name)
+    probs, log_probs = calculate_likelihoods(model, test_names)
+    for name, prob, log_prob in zip(test_names, probs, log_probs):
         results.append((name, prob, log_prob))
         print(f"{name:<15} {log_prob:<20.4f} {prob:.4e}")
         
@@ -125,6 +167,13 @@ def main():
         completion = generate_completion(model, prefix)
         print(f"Prefix: {prefix:<5} -> Completion: {completion}")
 
+    print("\n--- Part b) Top-3 Completions (beam search) ---")
+    for prefix in prefixes:
+        completions = generate_completions(model, prefix, k=3)
+        print(f"Prefix: {prefix:<5} -> " + ", ".join(
+            f"{name} ({log_prob:.2f})" for name, log_prob in completions
+        ))
+
     # Part c) Critique (printed for now, to be included in report)
     print("\n--- Part c) Critique ---")
     print("One least available result from a) or b) and how to improve.")
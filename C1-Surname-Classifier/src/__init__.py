@@ -1 +0,0 @@
-# C1 Surname Classifier Source Package
@@ -0,0 +1 @@
+"""Character n-gram models for classifying and completing surnames."""
@@ -0,0 +1,46 @@
+import hashlib
+
+import numpy as np
+
+from .count_store import read_arrays, write_arrays
+
+
+# bump when the meaning of a stored model's fields changes
+FORMAT_VERSION = 1
+
+
+def checksum(arrays):
+    """sha256 over every array's name, dtype, shape and raw bytes."""
+    digest = hashlib.sha256()
+    for key in sorted(arrays):
+        arr = np.ascontiguousarray(arrays[key])
+        digest.update(f"{key}:{arr.dtype.str}:{arr.shape};".encode("utf-8"))
+        if arr.size:
+            digest.update(arr.reshape(-1).view(np.uint8))
+    return digest.hexdigest()
+
+
+def save_artifact(path, kind, meta, arrays):
+    """Write a model as a versioned, checksummed count-store file."""
+    meta = dict(meta, kind=kind, format_version=FORMAT_VERSION,
+                sha256=checksum(arrays))
+    write_arrays(path, meta, arrays)
+
+
+def load_artifact(path, kind, mmap=True, verify=True):
+    """(meta, arrays) of a saved model, checked against kind and version.
+
+    Arrays are memory-mapped, so loading costs a header parse plus one
+    pass over the bytes for the checksum (skipped with verify=False).
+    """
+    meta, arrays = read_arrays(path, mmap)
+    if meta.get("kind") != kind:
+        raise ValueError(f"{path} holds a {meta.get('kind')!r} model, "
+                         f"expected {kind!r}")
+    if meta.get("format_version") != FORMAT_VERSION:
+        raise ValueError(f"{path} has model format version "
+                         f"{meta.get('format_version')}, expected "
+                         f"{FORMAT_VERSION}")
+    if verify and checksum(arrays) != meta["sha256"]:
+        raise ValueError(f"{path} is corrupt: checksum mismatch")
+    return meta, arrays
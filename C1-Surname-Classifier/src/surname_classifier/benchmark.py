@@ -0,0 +1,316 @@
+"""Benchmarks for the loading, counting, training and scoring hot paths.
+
+    python -m surname_classifier.benchmark --sizes 10000,100000,1000000
+    python -m surname_classifier.benchmark \
+        --save-baseline ../results/bench_baseline.json
+    python -m surname_classifier.benchmark \
+        --baseline ../results/bench_baseline.json
+
+Corpora are sampled from bigram models of the dev set, so name lengths
+and character statistics look like real surnames at any size.
+"""
+import argparse
+import functools
+import importlib.util
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+from .bigram_lm import BigramLM
+from .classifier import build_vectorizer, train_logistic
+from .ngrams import BOS, EOS
+from .task4_smoothing import build_lm, classify_batch, score_name
+from .trie import NgramTrie
+from .utils import (
+    PROJECT_DIR, compute_frequencies, load_data, split_by_language,
+)
+
+
+C2_ANALYSIS = os.path.join(
+    PROJECT_DIR, "C2-Surname-Likelihood", "analysis.py"
+)
+
+SIZES = [10_000, 100_000, 1_000_000]
+# per-name stages are timed on this many names and reported as names/s
+SAMPLE = 10_000
+MAX_LEN = 24
+# orders counted by the ngram_dict / ngram_trie memory comparison
+TRIE_ORDER = 5
+
+
+def sample_names(lm, size, rng):
+    """Draw names from a padded bigram LM, all rows advancing at once."""
+    chars = lm.alphabet.chars
+    probs = np.asarray(lm.counts)[:-1, :-1]
+    probs = probs / np.maximum(probs.sum(axis=1, keepdims=True), 1)
+    cdf = np.cumsum(probs, axis=1)
+    state = np.full(size, chars.index(BOS))
+    out = np.full((size, MAX_LEN), chars.index(EOS))
+    alive = np.ones(size, dtype=bool)
+    for step in range(MAX_LEN):
+        draws = rng.random(size)[:, None]
+        nxt = (cdf[state] < draws).sum(axis=1)
+        nxt = np.minimum(nxt, len(chars) - 1)
+        out[alive, step] = nxt[alive]
+        alive &= nxt != chars.index(EOS)
+        state = nxt
+        if not alive.any():
+            break
+    lookup = np.array(list(chars))
+    rows = ["".join(r) for r in lookup[out]]
+    return [r.split(EOS, 1)[0].capitalize() for r in rows]
+
+
+def synthetic_corpus(size, seed=0):
+    """(names, labels) with the dev set's language mix."""
+    names, labels = load_data()
+    eng, rus = split_by_language(names, labels)
+    rng = np.random.default_rng(seed)
+    n_eng = int(round(size * len(eng) / len(names)))
+    out_names, out_labels = [], []
+    for lang, train, count in (("English", eng, n_eng),
+                               ("Russian", rus, size - n_eng)):
+        lm = BigramLM.from_names(train, pad=True)
+        drawn = [n for n in sample_names(lm, count, rng) if len(n) > 1]
+        while len(drawn) < count:
+            drawn += [n for n in sample_names(lm, count, rng) if len(n) > 1]
+        out_names += drawn[:count]
+        out_labels += [lang] * count
+    order = rng.permutation(size)
+    return [out_names[i] for i in order], [out_labels[i] for i in order]
+
+
+def write_corpus(path, names, labels):
+    with open(path, "w", encoding="utf-8") as f:
+        f.writelines(f"{n},{l}\n" for n, l in zip(names, labels))
+
+
+@functools.lru_cache(maxsize=None)
+def load_c2():
+    """The C2 analysis module, loaded from its file.
+
+    It is a script folder rather than part of the package, so
+    it is loaded by path instead of being put on sys.path; None when
+    the folder is not there.
+    """
+    if not os.path.exists(C2_ANALYSIS):
+        return None
+    spec = importlib.util.spec_from_file_location("analysis", C2_ANALYSIS)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def build_stages(path, names, labels):
+    """name -> setup returning (callable, number of names it processes).
+
+    Fixtures are built inside the setups, and shared ones only once, so
+    a run limited to some stages pays only for what those stages use.
+    A setup returns None when its stage cannot run here.
+    """
+    sample = names[:SAMPLE]
+
+    @functools.lru_cache(maxsize=None)
+    def split():
+        return split_by_language(names, labels)
+
+    @functools.lru_cache(maxsize=None)
+    def eng_lm():
+        return build_lm(split()[0])
+
+    @functools.lru_cache(maxsize=None)
+    def c2_model():
+        return BigramLM.from_names(split()[0], k=0.0, pad=True,
+                                   unseen=1e-10)
+
+    def corpus_file():
+        write_corpus(path, names, labels)
+        return lambda: load_data(path), len(names)
+
+    def c2_stage(fn, prefix_only=False):
+        analysis = load_c2()
+        if analysis is None:
+            return None
+        fn, model = getattr(analysis, fn), c2_model()
+        if prefix_only:
+            return lambda: [fn(model, n[:3]) for n in sample], len(sample)
+        return lambda: [fn(model, n) for n in sample], len(sample)
+
+    def vectorizer():
+        # import scikit-learn here rather than inside the timing
+        build_vectorizer(sample[:10])
+        return lambda: build_vectorizer(names), len(names)
+
+    def logistic():
+        X = build_vectorizer(names)[1]
+        return lambda: train_logistic(X, labels), len(names)
+
+    def ngram_dict():
+        return [compute_frequencies(names, n)
+                for n in range(1, TRIE_ORDER + 1)]
+
+    return {
+        "load_data": corpus_file,
+        "compute_frequencies": lambda: (
+            lambda: compute_frequencies(names, n=2), len(names)),
+        "build_lm": lambda: (
+            lambda: build_lm(split()[0]), len(split()[0])),
+        "score_name": lambda: (
+            lambda: [score_name(n, eng_lm()) for n in sample], len(sample)),
+        "classify_batch": lambda: (
+            functools.partial(classify_batch, names, eng_lm(),
+                              build_lm(split()[1])), len(names)),
+        "calculate_likelihood": lambda: c2_stage("calculate_likelihood"),
+        "generate_completion": lambda: c2_stage(
+            "generate_completion", prefix_only=True),
+        "build_vectorizer": vectorizer,
+        "train_logistic": logistic,
+        # the same counts held as Counters and as one trie; compare
+        # their held memory
+        "ngram_dict": lambda: (ngram_dict, len(names)),
+        "ngram_trie": lambda: (
+            lambda: NgramTrie.from_names(names, TRIE_ORDER), len(names)),
+    }
+
+
+def best_time(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def peak_memory(fn):
+    """(peak, held): traced bytes at the peak while fn runs, and still
+    held by its result once it returns."""
+    tracemalloc.start()
+    try:
+        result = fn()
+        held, peak = tracemalloc.get_traced_memory()
+        del result
+        return peak, held
+    finally:
+        tracemalloc.stop()
+
+
+def run(sizes=SIZES, repeat=3, memory=True, stages=None, seed=0):
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in sizes:
+            names, labels = synthetic_corpus(size, seed)
+            path = os.path.join(tmp, f"corpus_{size}.txt")
+            for stage, setup in build_stages(path, names, labels).items():
+                if stages and stage not in stages:
+                    continue
+                job = setup()
+                if job is None:
+                    print(f"{stage:<22} skipped", flush=True)
+                    continue
+                fn, count = job
+                seconds = best_time(fn, repeat)
+                row = {
+                    "stage": stage, "size": size, "seconds": seconds,
+                    "names_per_s": count / seconds if seconds else None,
+                }
+                if memory:
+                    peak, held = peak_memory(fn)
+                    row["peak_mb"] = peak / 2 ** 20
+                    row["held_mb"] = held / 2 ** 20
+                results.append(row)
+                print(format_row(row), flush=True)
+    return results
+
+
+def format_row(row):
+    line = (f"{row['stage']:<22} {row['size']:>10,} "
+            f"{row['seconds']:>10.4f}s {row['names_per_s']:>14,.0f}/s")
+    if "peak_mb" in row:
+        line += f" {row['peak_mb']:>10.1f} MB"
+    if "held_mb" in row:
+        line += f" {row['held_mb']:>10.1f} MB"
+    return line
+
+
+def scaling(results):
+    """Throughput per stage across sizes, i.e. the scaling curve."""
+    curves = {}
+    for row in results:
+        curves.setdefault(row["stage"], []).append(
+            (row["size"], row["names_per_s"])
+        )
+    return curves
+
+
+def compare(results, baseline, tolerance=0.2):
+    """Rows whose throughput fell more than tolerance below baseline.
+
+    A stage without a recorded throughput on either side (skipped, or
+    too fast to time) has no baseline to compare against.
+    """
+    before = {(r["stage"], r["size"]): r for r in baseline}
+    regressions = []
+    for row in results:
+        old = before.get((row["stage"], row["size"]))
+        if (old is None or not old.get("names_per_s")
+                or row.get("names_per_s") is None):
+            continue
+        ratio = row["names_per_s"] / old["names_per_s"]
+        if ratio < 1 - tolerance:
+            regressions.append((row["stage"], row["size"], ratio))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default=",".join(map(str, SIZES)),
+                        help="comma-separated corpus sizes")
+    parser.add_argument("--stages", default=None,
+                        help="comma-separated subset of stages to run")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--no-memory", action="store_true",
+                        help="skip the tracemalloc peak-memory pass")
+    parser.add_argument("--output", help="write results as JSON here")
+    parser.add_argument("--save-baseline", help="write results as baseline")
+    parser.add_argument("--baseline", help="compare against this baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="allowed throughput drop before flagging")
+    args = parser.parse_args(argv)
+
+    sizes = [int(s) for s in args.sizes.split(",")]
+    stages = args.stages.split(",") if args.stages else None
+    print(f"{'Stage':<22} {'Names':>10} {'Time':>11} {'Throughput':>16}"
+          f"{'' if args.no_memory else '   Peak mem    Held mem'}")
+    print("-" * 88)
+    results = run(sizes, args.repeat, not args.no_memory, stages)
+
+    print("\nScaling (names/s by corpus size):")
+    for stage, curve in scaling(results).items():
+        points = "  ".join(f"{size:,}: {rate:,.0f}" for size, rate in curve)
+        print(f"  {stage:<22} {points}")
+
+    for path in filter(None, (args.output, args.save_baseline)):
+        with open(path, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults saved to {path}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print("\nRegressions:")
+            for stage, size, ratio in regressions:
+                print(f"  {stage} @ {size:,}: {ratio:.0%} of baseline")
+            return 1
+        print("\nNo regressions against baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,277 @@
+import numpy as np
+
+from .artifact import load_artifact, save_artifact
+from .ngrams import (
+    Alphabet, BOS, EOS, SEP, count_ngrams, encode_batch, ngram_ids,
+    pad_name,
+)
+
+
+# names scored per vectorized step; bounds the padded code matrix
+CHUNK_SIZE = 65536
+
+
+class BigramLM:
+    """Character bigram LM held as a dense log-probability matrix.
+
+    log_probs[a, b] = log P(b | a) with add-k smoothing already applied:
+
+        (C(a, b) + k) / (C(a) + k * V)
+
+    Codes come from `alphabet`; the extra last row/column (`oov`)
+    stands for any character the model was not built with, so scoring
+    never has to special-case unseen bigrams. When `unseen` is given,
+    bigrams with a zero count get that fixed probability instead.
+    """
+
+    def __init__(self, alphabet, counts, context_counts, k=1.0, V=None,
+                 pad=False, unseen=None, contexts_from_bigrams=False):
+        self.alphabet = alphabet
+        self.oov = alphabet.size
+        self.counts = counts
+        self.context_counts = context_counts
+        self.k = k
+        self.V = V if V is not None else int(
+            np.count_nonzero(self._present())
+        )
+        self.pad = pad
+        self.unseen = unseen
+        # True when C(a) is the number of bigrams a starts (padded C2
+        # model) rather than a's character count (task4 model)
+        self.contexts_from_bigrams = contexts_from_bigrams
+        self._log_probs = self._compute_rows(slice(None))
+        self._dirty = set()
+        # bumped by every add/remove, so derived structures can tell
+        # they are stale
+        self.version = 0
+
+    def _compute_rows(self, rows):
+        denom = self.context_counts[rows, None] + self.k * self.V
+        with np.errstate(divide="ignore", invalid="ignore"):
+            probs = (self.counts[rows] + self.k) / denom
+        if self.unseen is not None:
+            probs = np.where(self.counts[rows] > 0, probs, self.unseen)
+        with np.errstate(divide="ignore"):
+            return np.log(probs)
+
+    @property
+    def log_probs(self):
+        """The log-prob matrix, refreshing rows touched by add/remove."""
+        if self._dirty:
+            if not self._log_probs.flags.writeable:
+                self._log_probs = np.array(self._log_probs)
+            rows = np.array(sorted(self._dirty))
+            self._log_probs[rows] = self._compute_rows(rows)
+            self._dirty.clear()
+        return self._log_probs
+
+    def _present(self):
+        """Mask of characters that occur in any count."""
+        return (self.counts.sum(axis=0) + self.counts.sum(axis=1)
+                + self.context_counts) > 0
+
+    @classmethod
+    def from_counts(cls, bigram_counts, unigram_counts=None, k=1.0,
+                    alphabet=None, pad=False, unseen=None):
+        """Build from bigram (and context) count mappings.
+
+        Without unigram_counts the context count of a character is the
+        number of bigrams it starts, and V is the number of distinct
+        characters seen in the bigrams.
+        """
+        bigrams = list(bigram_counts.items())
+        if alphabet is None:
+            chars = "".join(bg for bg, _ in bigrams)
+            if unigram_counts is not None:
+                chars += "".join(unigram_counts.keys())
+            alphabet = Alphabet(chars.replace(SEP, ""))
+        size = alphabet.size + 1
+        counts = np.zeros((size, size))
+        if bigrams:
+            codes = alphabet.encode("".join(bg for bg, _ in bigrams))
+            codes = np.where(codes < 0, size - 1, codes).reshape(-1, 2)
+            values = np.array([c for _, c in bigrams], dtype=float)
+            np.add.at(counts, (codes[:, 0], codes[:, 1]), values)
+
+        if unigram_counts is None:
+            context_counts = counts.sum(axis=1)
+            V = len({ch for bg, _ in bigrams for ch in bg})
+        else:
+            context_counts = np.zeros(size)
+            unigrams = list(unigram_counts.items())
+            if unigrams:
+                codes = alphabet.encode("".join(u for u, _ in unigrams))
+                codes = np.where(codes < 0, size - 1, codes)
+                np.add.at(context_counts, codes,
+                          [c for _, c in unigrams])
+            V = len(unigram_counts)
+        return cls(alphabet, counts, context_counts, k=k, V=V, pad=pad,
+                   unseen=unseen,
+                   contexts_from_bigrams=unigram_counts is None)
+
+    @classmethod
+    def from_names(cls, names, k=1.0, alphabet=None, pad=False,
+                   unseen=None):
+        """Count names and build the LM; contexts are bigram row sums."""
+        return cls.from_counts(
+            count_ngrams(names, 2, pad), k=k, alphabet=alphabet, pad=pad,
+            unseen=unseen,
+        )
+
+    def encode(self, name):
+        name = name.lower()
+        if self.pad:
+            name = pad_name(name, 2)
+        codes = self.alphabet.encode(name)
+        return np.where(codes < 0, self.oov, codes)
+
+    def transition_log_probs(self, name):
+        """log P of each bigram of name, in order."""
+        codes = self.encode(name)
+        return self.log_probs[codes[:-1], codes[1:]]
+
+    def score(self, name):
+        """Log probability of a name under the model."""
+        return float(self.transition_log_probs(name).sum())
+
+    def encode_batch(self, names):
+        """(m, L) code matrix of names (unknown characters -> oov)."""
+        codes, lengths = encode_batch(names, self.alphabet, 2, self.pad)
+        return np.where(codes < 0, self.oov, codes), lengths
+
+    def score_batch(self, names, chunk_size=CHUNK_SIZE):
+        """Log probabilities of many names as one array."""
+        return score_batch([self], names, chunk_size)[0]
+
+    def _grow(self, chars):
+        """Re-home the count arrays on an alphabet that includes chars."""
+        alphabet = Alphabet(self.alphabet.chars + chars)
+        old = np.append(alphabet.encode(self.alphabet.chars), alphabet.size)
+        size = alphabet.size + 1
+        counts = np.zeros((size, size))
+        counts[np.ix_(old, old)] = self.counts
+        context_counts = np.zeros(size)
+        context_counts[old] = self.context_counts
+        self.alphabet, self.oov = alphabet, alphabet.size
+        self.counts, self.context_counts = counts, context_counts
+        self._log_probs = np.zeros((size, size))
+        self._dirty.update(range(size))
+
+    def _count_delta(self, names):
+        names = list(names)
+        chars = set("".join(names).lower())
+        if self.pad and names:
+            chars |= {BOS, EOS}
+        new = chars - set(self.alphabet.chars)
+        if new:
+            self._grow("".join(new))
+        size = self.oov + 1
+        ids, _ = ngram_ids(names, 2, self.pad, self.alphabet)
+        bigrams = np.bincount(ids // self.alphabet.size * size
+                              + ids % self.alphabet.size,
+                              minlength=size * size).reshape(size, size)
+        if self.contexts_from_bigrams:
+            contexts = bigrams.sum(axis=1)
+        else:
+            chars, _ = ngram_ids(
+                [name for name in names if len(name) >= 2], 1, False,
+                self.alphabet,
+            )
+            contexts = np.bincount(chars, minlength=size)
+        return bigrams, contexts
+
+    def _apply(self, bigrams, contexts, sign):
+        if not self.counts.flags.writeable:
+            self.counts = np.array(self.counts)
+            self.context_counts = np.array(self.context_counts)
+        before = self._present()
+        self.counts += sign * bigrams
+        self.context_counts += sign * contexts
+        if (self.counts < 0).any() or (self.context_counts < 0).any():
+            self.counts -= sign * bigrams
+            self.context_counts -= sign * contexts
+            raise ValueError("cannot remove names the model never saw")
+        self.version += 1
+        V = self.V + int(self._present().sum() - before.sum())
+        if V != self.V:
+            # the smoothing denominator of every row depends on V
+            self.V = V
+            self._dirty.update(range(self.oov + 1))
+        else:
+            touched = (contexts > 0) | bigrams.any(axis=1)
+            self._dirty.update(np.flatnonzero(touched).tolist())
+
+    def add(self, names):
+        """Count more training names in place.
+
+        Costs time proportional to the new names; probabilities of the
+        affected rows are recomputed the next time log_probs is read.
+        """
+        self._apply(*self._count_delta(names), 1)
+
+    def remove(self, names):
+        """Undo add() (or the original training) for these names."""
+        self._apply(*self._count_delta(names), -1)
+
+    def save(self, path):
+        meta = {
+            "alphabet": self.alphabet.chars,
+            "k": self.k, "V": self.V, "pad": self.pad,
+            "unseen": self.unseen,
+            "contexts_from_bigrams": self.contexts_from_bigrams,
+        }
+        save_artifact(path, "bigram_lm", meta, {
+            "log_probs": self.log_probs, "counts": self.counts,
+            "context_counts": self.context_counts,
+        })
+
+    @classmethod
+    def load(cls, path, mmap=True, verify=True):
+        meta, arrays = load_artifact(path, "bigram_lm", mmap, verify)
+        lm = cls.__new__(cls)
+        lm.alphabet = Alphabet(meta["alphabet"])
+        lm.oov = lm.alphabet.size
+        lm.k, lm.V = meta["k"], meta["V"]
+        lm.pad, lm.unseen = meta["pad"], meta["unseen"]
+        lm.contexts_from_bigrams = meta.get("contexts_from_bigrams", False)
+        lm.counts = arrays["counts"]
+        lm.context_counts = arrays["context_counts"]
+        lm._log_probs = arrays["log_probs"]
+        lm._dirty = set()
+        lm.version = 0
+        return lm
+
+
+def masked_sums(tables, codes, lengths):
+    """Sum each row's bigram log-probs under every table at once."""
+    if codes.shape[1] < 2:
+        return np.zeros((len(tables), len(codes)))
+    gathered = tables[:, codes[:, :-1], codes[:, 1:]]
+    # bigram j of a row is real only while j + 1 < its length
+    mask = np.arange(1, codes.shape[1]) < lengths[:, None]
+    return np.where(mask, gathered, 0.0).sum(axis=2)
+
+
+def score_batch(lms, names, chunk_size=CHUNK_SIZE):
+    """Log probabilities of names under each LM, shape (len(lms), m).
+
+    LMs sharing an alphabet and padding mode are scored together from a
+    single encoding of the names with one gather on their stacked
+    (L, V, V) tables, so more languages add a dimension to that gather
+    rather than another pass over the names. The gathered block is
+    (L, chunk, length), so chunks shrink as L grows past a pair.
+    """
+    names = list(names)
+    first = lms[0]
+    if any(lm.alphabet.chars != first.alphabet.chars
+           or lm.pad != first.pad for lm in lms):
+        return np.stack([lm.score_batch(names, chunk_size) for lm in lms])
+    tables = np.stack([np.asarray(lm.log_probs) for lm in lms])
+    scores = np.zeros((len(lms), len(names)))
+    step = max(1, chunk_size * 2 // max(len(lms), 2))
+    for start in range(0, len(names), step):
+        codes, lengths = first.encode_batch(names[start:start + step])
+        scores[:, start:start + len(codes)] = masked_sums(
+            tables, codes, lengths
+        )
+    return scores
@@ -0,0 +1,174 @@
+import numpy as np
+
+from . import instrument
+
+
+@instrument.timed("build_vectorizer")
+def build_vectorizer(names, ngram_range=(2, 2), n_features=None,
+                     alternate_sign=False):
+    """Char n-gram count features for names.
+
+    With n_features the vocabulary is replaced by the hashing trick: no
+    fit pass, no vocabulary in memory, same CSR count matrix layout
+    (columns are hash buckets instead of vocabulary entries).
+    """
+    if n_features is not None:
+        vectorizer = build_hashing_vectorizer(
+            ngram_range, n_features, alternate_sign
+        )
+        return vectorizer, vectorizer.transform(names)
+    from sklearn.feature_extraction.text import CountVectorizer
+
+    vectorizer = CountVectorizer(
+        analyzer="char", ngram_range=ngram_range
+    )
+    X = vectorizer.fit_transform(names)
+    return vectorizer, X
+
+
+@instrument.timed("train_logistic")
+def train_logistic(X, y, C=1.0):
+    from sklearn.linear_model import LogisticRegression
+
+    instrument.count("logistic_rows", X.shape[0])
+    model = LogisticRegression(C=C, max_iter=1000, random_state=42)
+    model.fit(X, y)
+    return model
+
+
+def build_hashing_vectorizer(ngram_range=(2, 2), n_features=2 ** 18,
+                             alternate_sign=False):
+    # fixed feature space: nothing to fit, so new names never change
+    # the columns an incrementally trained model has already seen;
+    # alternate_sign makes colliding n-grams cancel out on average
+    from sklearn.feature_extraction.text import HashingVectorizer
+
+    return HashingVectorizer(
+        analyzer="char", ngram_range=ngram_range,
+        n_features=n_features, alternate_sign=alternate_sign, norm=None
+    )
+
+
+def transform_names(vectorizer, names, workers=None):
+    """vectorizer.transform, split across processes when workers > 1.
+
+    Only stateless (hashing) vectorizers are worth sending to workers;
+    a fitted CountVectorizer would be pickled along with its vocabulary.
+    """
+    if workers is not None and workers > 1:
+        from .parallel import parallel_transform
+        return parallel_transform(vectorizer, names, workers)
+    return vectorizer.transform(names)
+
+
+def train_online(X, y, model=None, classes=("English", "Russian")):
+    """Logistic regression trained batch by batch with partial_fit.
+
+    Pass the returned model back in to fold in more labelled names at
+    a cost proportional to the new batch only.
+    """
+    if model is None:
+        from sklearn.linear_model import SGDClassifier
+
+        model = SGDClassifier(loss="log_loss", random_state=42)
+    model.partial_fit(X, y, classes=list(classes))
+    return model
+
+
+def predict_names(vectorizer, model, names, workers=None):
+    if workers is not None and workers > 1:
+        from .parallel import parallel_predict
+        return parallel_predict(vectorizer, model, names, workers)
+    return model.predict(vectorizer.transform(names))
+
+
+def multiclass_metrics(y_true, y_pred, labels=None):
+    """Confusion matrix and per-class/averaged scores for any labels.
+
+    Rows of "confusion" are true labels, columns predicted ones, both
+    in the order of labels (sorted by default); pairs with a label
+    outside labels are left out. Classes never predicted (or never
+    seen) score 0 rather than raising.
+    """
+    y_true, y_pred = np.asarray(y_true), np.asarray(y_pred)
+    if labels is None:
+        labels = np.union1d(y_true, y_pred)
+    labels = np.asarray(labels)
+    order = np.argsort(labels)
+    L = len(labels)
+
+    def codes(y):
+        pos = np.searchsorted(labels, y, sorter=order).clip(max=L - 1)
+        found = labels[order[pos]] == y
+        return np.where(found, order[pos], -1)
+
+    true, pred = codes(y_true), codes(y_pred)
+    keep = (true >= 0) & (pred >= 0)
+    confusion = np.bincount(true[keep] * L + pred[keep],
+                            minlength=L * L).reshape(L, L)
+    hits = np.diag(confusion).astype(np.float64)
+    support = confusion.sum(axis=1)
+    predicted = confusion.sum(axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        precision = np.where(predicted > 0, hits / predicted, 0.0)
+        recall = np.where(support > 0, hits / support, 0.0)
+        f1 = np.where(precision + recall > 0,
+                      2 * precision * recall / (precision + recall), 0.0)
+    total = support.sum()
+    return {
+        "labels": labels, "confusion": confusion,
+        "precision": precision, "recall": recall, "f1": f1,
+        "support": support,
+        "accuracy": hits.sum() / total if total else 0.0,
+        "macro_precision": precision.mean(),
+        "macro_recall": recall.mean(),
+        "macro_f1": f1.mean(),
+        "weighted_f1": (f1 * support).sum() / total if total else 0.0,
+    }
+
+
+def print_confusion(confusion, labels):
+    width = max(6, len(str(confusion.max())))
+    tags = [str(label)[:3] for label in labels]
+    if len(set(tags)) < len(tags):
+        tags = [str(label) for label in labels]
+    tag_width = max(len(tag) for tag in tags) + 2
+    print("Confusion Matrix:")
+    print(" " * (9 + tag_width) + "Predicted")
+    print(" " * (7 + tag_width)
+          + "".join(f"{tag:<{width + 1}}" for tag in tags).rstrip())
+    for i, (tag, row) in enumerate(zip(tags, confusion)):
+        prefix = "Actual " if i == 0 else " " * 7
+        cells = " ".join(f"{value:<{width}}" for value in row)
+        print(f"{prefix}{tag:<{tag_width}}{cells.rstrip()}")
+
+
+def evaluate(y_true, y_pred, label="Results", labels=None,
+             pos_label="Russian"):
+    """Print a report and confusion matrix; return the scores.
+
+    precision/recall/f1 are those of pos_label for a two-class problem
+    that has it, otherwise their macro averages; the remaining
+    multiclass_metrics keys are returned alongside.
+    """
+    from sklearn.metrics import classification_report
+
+    print(f"\n{label}")
+    print("=" * 40)
+    print(classification_report(y_true, y_pred))
+
+    metrics = multiclass_metrics(y_true, y_pred, labels)
+    print_confusion(metrics["confusion"], metrics["labels"])
+
+    classes = list(metrics["labels"])
+    if len(classes) == 2 and pos_label in classes:
+        i = classes.index(pos_label)
+        p, r, f = (metrics[key][i] for key in ("precision", "recall", "f1"))
+    else:
+        p, r, f = (metrics["macro_precision"], metrics["macro_recall"],
+                   metrics["macro_f1"])
+    return {"precision": p, "recall": r, "f1": f, **{
+        key: metrics[key] for key in (
+            "accuracy", "macro_f1", "weighted_f1", "confusion", "labels"
+        )
+    }}
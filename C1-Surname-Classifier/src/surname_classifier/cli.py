@@ -0,0 +1,188 @@
+"""Command line entry point for training, scoring and completing surnames.
+
+    surnames train --out models/
+    surnames score Ivanov Smith --models models/
+    surnames analyze -n 3 --top 10
+    surnames complete Ber -k 5 --models models/
+    surnames count -n 5 --pad --memory 512 --out counts.store
+    surnames --metrics metrics.prom --profile train.prof train
+
+Each subcommand imports only what it needs: scoring and completion
+load saved models with numpy alone, while scikit-learn is imported
+only when training.
+"""
+import argparse
+import sys
+
+from . import instrument
+from .utils import LANGUAGES
+
+
+def train(args):
+    from .models import save_models
+
+    save_models(args.out, args.data, k=args.k, logistic=not args.no_logistic,
+                languages=None if args.all_languages else args.languages,
+                clean=args.clean, bloom=args.bloom)
+    print(f"Models saved to {args.out}/")
+
+
+def read_names(args):
+    if args.names == ["-"]:
+        return [line.strip() for line in sys.stdin if line.strip()]
+    return args.names
+
+
+def score(args):
+    from .models import load_models, saved_languages
+
+    names = read_names(args)
+    if args.model == "logistic":
+        model = load_models(args.models, ["logistic"])["logistic"]
+        probs = model.predict_proba(names)
+        labels = model.classes[probs.argmax(axis=1)]
+        for name, label, row in zip(names, labels, probs):
+            print(f"{name}\t{label}\t{row.max():.4f}")
+        return
+    from .bigram_lm import score_batch
+
+    languages = args.languages or saved_languages(args.models)
+    lms = load_models(args.models, languages)
+    with instrument.timer("score_batch"):
+        scores = score_batch([lms[lang] for lang in languages], names)
+    instrument.count("names_scored", len(names))
+    labels = [languages[i] for i in scores.argmax(axis=0)]
+    for name, label, row in zip(names, labels, scores.T):
+        print("\t".join([name, label] + [f"{s:.4f}" for s in row]))
+
+
+def analyze(args):
+    from .utils import compute_frequencies, group_by_language, load_data
+
+    languages = [args.lang] if args.lang else LANGUAGES
+    names, labels = load_data(args.data, languages, clean=args.clean,
+                              bloom=args.bloom)
+    if args.lang:
+        names = group_by_language(names, labels, languages)[args.lang]
+    for n in args.n:
+        freqs = compute_frequencies(names, n=n)
+        total = sum(freqs.values())
+        print(f"{n}-grams: {total} total, {len(freqs)} unique")
+        for gram, count in freqs.most_common(args.top):
+            print(f"  '{gram}'\t{count}\t{count / total:.2%}")
+
+
+def count(args):
+    from .count_store import CountStore
+    from .external import count_file_to_store
+
+    count_file_to_store(args.out, args.data, n=args.n, pad=args.pad,
+                        lang=args.lang, memory=args.memory << 20,
+                        tmp_dir=args.tmp_dir)
+    store = CountStore(args.out)
+    print(f"{len(store)} unique {args.n}-grams, {store.total} total, "
+          f"saved to {args.out}")
+
+
+def complete(args):
+    from .completion import Completer
+    from .models import load_models
+
+    lm = load_models(args.models, ["complete"])["complete"]
+    for name, log_prob in Completer(lm).complete(args.prefix, args.k):
+        print(f"{name}\t{log_prob:.4f}")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="surnames", description=__doc__.splitlines()[0]
+    )
+    parser.add_argument("--metrics",
+                        help="write stage timings and counters here when "
+                             "done: .prom for Prometheus text, otherwise "
+                             "JSON, - for stdout")
+    parser.add_argument("--profile",
+                        help="save cProfile stats of the command here")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="report peak memory and top allocation "
+                             "sites (tracemalloc)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    p = commands.add_parser("train", help="train and save all models")
+    p.add_argument("--data", help="labelled name file (default: dev set)")
+    p.add_argument("--out", default="models")
+    p.add_argument("-k", type=float, default=1.0,
+                   help="add-k smoothing for the classifier LMs")
+    p.add_argument("--no-logistic", action="store_true",
+                   help="skip the logistic model (no scikit-learn)")
+    p.add_argument("--languages", nargs="+", default=list(LANGUAGES),
+                   help="labels to train an LM for")
+    p.add_argument("--all-languages", action="store_true",
+                   help="train an LM for every label in the data")
+    p.add_argument("--clean", action="store_true",
+                   help="normalize and deduplicate the data (cached)")
+    p.add_argument("--bloom", type=int, metavar="N",
+                   help="with --clean, deduplicate through a Bloom filter "
+                        "sized for N names (bounded memory, may drop a "
+                        "few unique names)")
+    p.set_defaults(func=train)
+
+    p = commands.add_parser("score", help="classify names")
+    p.add_argument("names", nargs="+", help="names, or - to read stdin")
+    p.add_argument("--models", default="models")
+    p.add_argument("--model", choices=["lm", "logistic"], default="lm")
+    p.add_argument("--languages", nargs="+",
+                   help="saved language LMs to choose between "
+                        "(default: every saved one)")
+    p.set_defaults(func=score)
+
+    p = commands.add_parser("analyze", help="n-gram frequency summary")
+    p.add_argument("--data", help="labelled name file (default: dev set)")
+    p.add_argument("-n", type=int, nargs="+", default=[2],
+                   help="n-gram orders")
+    p.add_argument("--top", type=int, default=20)
+    p.add_argument("--clean", action="store_true",
+                   help="normalize and deduplicate the data (cached)")
+    p.add_argument("--bloom", type=int, metavar="N",
+                   help="with --clean, deduplicate through a Bloom filter "
+                        "sized for N names (bounded memory, may drop a "
+                        "few unique names)")
+    p.add_argument("--lang", help="only names with this label")
+    p.set_defaults(func=analyze)
+
+    p = commands.add_parser(
+        "count", help="count n-grams into a store within a RAM budget"
+    )
+    p.add_argument("--data", help="labelled name file (default: dev set)")
+    p.add_argument("--out", required=True, help="count store path")
+    p.add_argument("-n", type=int, default=2)
+    p.add_argument("--pad", action="store_true")
+    p.add_argument("--lang")
+    p.add_argument("--memory", type=int, default=256,
+                   help="RAM budget in MB; beyond it sorted runs are "
+                        "spilled to disk and merged")
+    p.add_argument("--tmp-dir", help="where spilled runs go")
+    p.set_defaults(func=count)
+
+    p = commands.add_parser("complete", help="top-k name completions")
+    p.add_argument("prefix")
+    p.add_argument("-k", type=int, default=5)
+    p.add_argument("--models", default="models")
+    p.set_defaults(func=complete)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if not (args.metrics or args.profile or args.trace_memory):
+        args.func(args)
+        return
+    instrument.enable()
+    with instrument.capture(args.profile, args.trace_memory):
+        args.func(args)
+    if args.metrics:
+        instrument.dump(args.metrics)
+
+
+if __name__ == "__main__":
+    main()
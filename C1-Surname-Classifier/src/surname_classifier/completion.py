@@ -0,0 +1,106 @@
+from functools import lru_cache
+
+import numpy as np
+
+from .ngrams import BOS, EOS
+
+
+class Completer:
+    """Top-k name completions by beam search over a padded BigramLM.
+
+    Successors of every context are argsorted by log-prob once up
+    front, so each beam step only reads the head of a few sorted rows.
+    Prefix states (last character, log P of "^" + prefix) are kept in an
+    LRU cache, so typing one more character costs a single lookup on
+    top of the cached state of the shorter prefix. Both are rebuilt when
+    the model has changed since (BigramLM.add/remove).
+    """
+
+    def __init__(self, lm, max_len=20, cache_size=4096):
+        if not lm.pad:
+            raise ValueError("completion needs a model trained with ^/$")
+        self.lm = lm
+        self.max_len = max_len
+        self.cache_size = cache_size
+        self._build()
+
+    def _build(self):
+        lm = self.lm
+        self.version = lm.version
+        self.chars = lm.alphabet.chars
+        self.bos = self.chars.index(BOS)
+        self.eos = self.chars.index(EOS)
+        log_probs = np.asarray(lm.log_probs)[:-1, :-1]
+        counts = np.asarray(lm.counts)[:-1, :-1]
+        self.successors = np.argsort(-log_probs, axis=1, kind="stable")
+        self.successor_log_probs = np.take_along_axis(
+            log_probs, self.successors, axis=1
+        )
+        # only successors actually seen in training are expanded
+        self.n_successors = (counts > 0).sum(axis=1)
+        self.prefix_state = lru_cache(maxsize=self.cache_size)(self._state)
+
+    def _state(self, prefix):
+        if not prefix:
+            return self.bos, 0.0
+        context, score = self.prefix_state(prefix[:-1])
+        code = self.lm.alphabet.index(prefix[-1])
+        if code < 0:
+            code = self.lm.oov
+        return code, score + float(self.lm.log_probs[context, code])
+
+    def complete(self, prefix, k=5, beam_width=None):
+        """The k most likely (name, log P(^name$)) starting with prefix.
+
+        Names still unfinished at max_len are returned without the
+        end-of-name term, like generate_completion does.
+        """
+        if k < 1:
+            raise ValueError(f"k must be at least 1, got {k}")
+        if self.version != self.lm.version:
+            self._build()
+        beam_width = beam_width or max(k, 8)
+        last, score = self.prefix_state(prefix.lower())
+        texts = [prefix]
+        lasts = np.array([last])
+        scores = np.array([score])
+        finished = []
+
+        for _ in range(len(prefix), self.max_len):
+            live = lasts < len(self.chars)
+            texts = [t for t, ok in zip(texts, live) if ok]
+            lasts, scores = lasts[live], scores[live]
+            if not len(lasts):
+                break
+            width = min(beam_width, self.successors.shape[1])
+            nxt = self.successors[lasts, :width]
+            cand = scores[:, None] + self.successor_log_probs[lasts, :width]
+            cand[np.arange(width) >= self.n_successors[lasts, None]] = -np.inf
+
+            ends = nxt == self.eos
+            for row, col in zip(*np.nonzero(ends & np.isfinite(cand))):
+                finished.append((texts[row], float(cand[row, col])))
+            cand[ends] = -np.inf
+
+            flat = cand.ravel()
+            top = np.argsort(-flat, kind="stable")[:beam_width]
+            top = top[np.isfinite(flat[top])]
+            if not len(top):
+                texts = []
+                break
+            rows, cols = np.divmod(top, width)
+            texts = [texts[r] + self.chars[nxt[r, c]]
+                     for r, c in zip(rows, cols)]
+            lasts, scores = nxt[rows, cols], flat[top]
+            # anything that cannot beat the k-th finished name is dropped
+            if len(finished) >= k:
+                kth = sorted(s for _, s in finished)[-k]
+                keep = scores > kth
+                texts = [t for t, ok in zip(texts, keep) if ok]
+                lasts, scores = lasts[keep], scores[keep]
+
+        finished += [(t, float(s)) for t, s in zip(texts, scores)]
+        if not finished:
+            return [(prefix, score)]
+        finished.sort(key=lambda item: -item[1])
+        return finished[:k]
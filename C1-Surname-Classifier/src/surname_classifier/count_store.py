@@ -0,0 +1,200 @@
+import json
+import struct
+import numpy as np
+
+from .ngrams import Alphabet, SEP, ngram_ids, count_ids, unpack_ids
+
+
+MAGIC = b"NGCS"
+VERSION = 1
+ALIGN = 64
+
+# id spaces up to this many cells are stored as one dense count array
+DENSE_STORE_LIMIT = 1 << 20
+
+
+def write_arrays(path, meta, arrays):
+    """Write a JSON header plus raw, 64-byte aligned arrays to path.
+
+    Layout: MAGIC, uint32 version, uint32 header length, the header,
+    then each array's bytes at the offset recorded in the header.
+    """
+    arrays = {k: np.ascontiguousarray(v) for k, v in arrays.items()}
+    specs, offset = {}, 0
+    for key, arr in arrays.items():
+        specs[key] = {
+            "dtype": arr.dtype.str, "shape": list(arr.shape),
+            "offset": offset,
+        }
+        offset += -(-arr.nbytes // ALIGN) * ALIGN
+    header = json.dumps(dict(meta, arrays=specs)).encode("utf-8")
+    start = -(-(len(MAGIC) + 8 + len(header)) // ALIGN) * ALIGN
+    with open(path, "wb") as f:
+        f.write(MAGIC + struct.pack("<II", VERSION, len(header)))
+        f.write(header)
+        for key, arr in arrays.items():
+            f.seek(start + specs[key]["offset"])
+            # tofile streams memory-mapped inputs instead of copying them
+            arr.tofile(f)
+        f.truncate(start + offset)
+
+
+def read_arrays(path, mmap=True):
+    """Inverse of write_arrays: (meta, {name: array}).
+
+    With mmap the arrays are read-only views onto the file and nothing
+    is loaded until it is touched.
+    """
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not in the count store format")
+        version, size = struct.unpack("<II", f.read(8))
+        if version != VERSION:
+            raise ValueError(f"unsupported format version {version}")
+        meta = json.loads(f.read(size).decode("utf-8"))
+    start = -(-(len(MAGIC) + 8 + size) // ALIGN) * ALIGN
+    specs = meta.pop("arrays")
+    arrays = {}
+    for key, spec in specs.items():
+        shape = tuple(spec["shape"])
+        if mmap and all(shape):
+            arrays[key] = np.memmap(
+                path, dtype=spec["dtype"], mode="r",
+                offset=start + spec["offset"], shape=shape,
+            )
+        else:
+            count = int(np.prod(shape))
+            with open(path, "rb") as f:
+                f.seek(start + spec["offset"])
+                arrays[key] = np.fromfile(
+                    f, dtype=spec["dtype"], count=count
+                ).reshape(shape)
+    return meta, arrays
+
+
+def write_count_arrays(path, ids, counts, alphabet, n, pad=False,
+                       presorted=False):
+    base = max(alphabet.size, 1)
+    space = base ** n
+    meta = {
+        "n": n, "pad": pad, "alphabet": alphabet.chars,
+        "unique": int(len(ids)), "total": int(np.sum(counts)),
+    }
+    if space <= DENSE_STORE_LIMIT:
+        dense = np.zeros(space, dtype=np.int64)
+        dense[ids] = counts
+        meta["layout"] = "dense"
+        write_arrays(path, meta, {"counts": dense})
+    else:
+        ids = np.asarray(ids, dtype=np.int64)
+        counts = np.asarray(counts, dtype=np.int64)
+        if not presorted:
+            order = np.argsort(ids)
+            ids, counts = ids[order], counts[order]
+        meta["layout"] = "sparse"
+        write_arrays(path, meta, {"keys": ids, "counts": counts})
+
+
+def save_counts(path, counts, pad=False):
+    """Write a Counter from compute_frequencies as a count store."""
+    grams = list(counts)
+    if not grams:
+        raise ValueError("cannot save an empty count table")
+    n = len(grams[0])
+    alphabet = Alphabet(SEP + "".join(grams))
+    base = alphabet.size
+    codes = alphabet.encode("".join(grams)).reshape(-1, n)
+    ids = np.zeros(len(grams), dtype=np.int64)
+    for j in range(n):
+        ids = ids * base + codes[:, j]
+    values = np.fromiter(counts.values(), dtype=np.int64, count=len(grams))
+    write_count_arrays(path, ids, values, alphabet, n, pad)
+
+
+def build_count_store(path, names, n=2, pad=False):
+    """Count n-grams of names straight into a store, skipping Counter."""
+    ids, alphabet = ngram_ids(names, n, pad)
+    base = max(alphabet.size, 1)
+    uniq, counts = count_ids(ids, base ** n)
+    write_count_arrays(path, uniq, counts, alphabet, n, pad)
+
+
+class CountStore:
+    """Read-only, memory-mapped n-gram counts with a Counter-like API."""
+
+    def __init__(self, path, mmap=True):
+        meta, arrays = read_arrays(path, mmap)
+        self.path = path
+        self.n = meta["n"]
+        self.pad = meta["pad"]
+        self.dense = meta["layout"] == "dense"
+        self.total = meta["total"]
+        self.alphabet = Alphabet(meta["alphabet"])
+        self.base = max(self.alphabet.size, 1)
+        self.counts = arrays["counts"]
+        self.sorted_ids = None if self.dense else arrays["keys"]
+        self._len = meta["unique"]
+
+    def __len__(self):
+        return self._len
+
+    def ids(self, grams):
+        """Packed ids for grams; -1 where a gram cannot be stored."""
+        grams = list(grams)
+        ids = np.full(len(grams), -1, dtype=np.int64)
+        fits = np.array([len(g) == self.n for g in grams], dtype=bool)
+        if fits.any():
+            text = "".join(g for g, ok in zip(grams, fits) if ok)
+            codes = self.alphabet.encode(text).reshape(-1, self.n)
+            packed = np.zeros(len(codes), dtype=np.int64)
+            for j in range(self.n):
+                packed = packed * self.base + codes[:, j]
+            packed[(codes < 0).any(axis=1)] = -1
+            ids[fits] = packed
+        return ids
+
+    def lookup_ids(self, ids):
+        """Vectorized counts for packed ids (0 for unseen, -1 ids)."""
+        ids = np.asarray(ids, dtype=np.int64)
+        out = np.zeros(ids.shape, dtype=np.int64)
+        known = ids >= 0
+        if self.dense:
+            out[known] = self.counts[ids[known]]
+        elif len(self.sorted_ids):
+            pos = np.searchsorted(self.sorted_ids, ids[known])
+            pos = np.minimum(pos, len(self.sorted_ids) - 1)
+            hit = self.sorted_ids[pos] == ids[known]
+            out[np.flatnonzero(known)[hit]] = self.counts[pos[hit]]
+        return out
+
+    def lookup(self, grams):
+        return self.lookup_ids(self.ids(grams))
+
+    def get(self, gram, default=0):
+        count = int(self.lookup([gram])[0])
+        return count if count else default
+
+    def __getitem__(self, gram):
+        return self.get(gram, 0)
+
+    def __contains__(self, gram):
+        return bool(self.lookup([gram])[0])
+
+    def _arrays(self):
+        if self.dense:
+            ids = np.flatnonzero(np.asarray(self.counts))
+            return ids, np.asarray(self.counts[ids])
+        return np.asarray(self.sorted_ids), np.asarray(self.counts)
+
+    def keys(self):
+        ids, _ = self._arrays()
+        return self.alphabet.decode(unpack_ids(ids, self.base, self.n))
+
+    def values(self):
+        return self._arrays()[1].tolist()
+
+    def items(self):
+        return zip(self.keys(), self.values())
+
+    def __iter__(self):
+        return iter(self.keys())
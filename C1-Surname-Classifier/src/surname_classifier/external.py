@@ -0,0 +1,267 @@
+"""Out-of-core n-gram counting: sorted runs spilled to disk, k-way merged.
+
+Ids are buffered until the memory budget is reached, reduced to one
+sorted (id, count) run and written to a temporary file. The runs are
+then merged block by block straight into a count store, so neither the
+corpus nor the full count table ever has to fit in memory.
+"""
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from .count_store import DENSE_STORE_LIMIT, write_count_arrays
+from .ngrams import Alphabet, SEP, code_points, ngram_ids
+
+
+DEFAULT_MEMORY = 256 << 20
+# peak bytes per buffered (id, count) pair while a run is reduced:
+# the buffered pair, its concatenation, the argsort, the sorted copies
+# and the reduced output
+PAIR_BYTES = 96
+# smallest block read from each run during a merge
+MIN_BLOCK = 1 << 12
+
+
+def reduce_counts(ids, counts):
+    """Sorted unique ids with the counts of equal ids summed."""
+    ids = np.asarray(ids, dtype=np.int64)
+    counts = np.asarray(counts, dtype=np.int64)
+    if not len(ids):
+        return ids, counts
+    order = np.argsort(ids, kind="stable")
+    ids = ids[order]
+    starts = np.flatnonzero(np.r_[True, ids[1:] != ids[:-1]])
+    return ids[starts], np.add.reduceat(counts[order], starts)
+
+
+def merge_runs(runs, block=MIN_BLOCK):
+    """k-way merge of sorted (ids, counts) runs.
+
+    Yields sorted, summed (ids, counts) blocks. Each run has one
+    buffered block. Ids up to the smallest last id buffered from a run
+    that still has more to read are final, since everything after them
+    in that run is larger: each round takes them from every buffer,
+    and a run is read again only once its buffer is used up. At most
+    len(runs) * block pairs are buffered, plus the round being merged.
+    """
+    pos = [0] * len(runs)
+    buffers = [None] * len(runs)
+    while True:
+        for i, (ids, counts) in enumerate(runs):
+            if buffers[i] is not None and len(buffers[i][0]):
+                continue
+            if pos[i] >= len(ids):
+                buffers[i] = None
+                continue
+            stop = min(pos[i] + block, len(ids))
+            buffers[i] = (np.asarray(ids[pos[i]:stop]),
+                          np.asarray(counts[pos[i]:stop]))
+            pos[i] = stop
+        live = [i for i, b in enumerate(buffers) if b is not None]
+        if not live:
+            return
+        bounds = [int(buffers[i][0][-1]) for i in live
+                  if pos[i] < len(runs[i][0])]
+        parts = []
+        for i in live:
+            ids, counts = buffers[i]
+            cut = (int(np.searchsorted(ids, min(bounds), side="right"))
+                   if bounds else len(ids))
+            parts.append((ids[:cut], counts[:cut]))
+            buffers[i] = (ids[cut:], counts[cut:])
+        ids, counts = reduce_counts(np.concatenate([p[0] for p in parts]),
+                                    np.concatenate([p[1] for p in parts]))
+        if len(ids):
+            yield ids, counts
+
+
+class ExternalCounter:
+    """Counts ids within a RAM budget, spilling sorted runs to disk.
+
+        with ExternalCounter(memory=64 << 20) as counter:
+            for ids in id_batches:
+                counter.add(ids)
+            for ids, counts in counter.merge():
+                ...
+
+    memory is the budget in bytes for buffered ids and for the merge.
+    Runs go to a temporary directory under tmp_dir that is removed on
+    close.
+    """
+
+    def __init__(self, memory=DEFAULT_MEMORY, tmp_dir=None):
+        self.memory = memory
+        self.limit = max(memory // PAIR_BYTES, MIN_BLOCK)
+        self.tmp_dir = tempfile.mkdtemp(prefix="ngram-runs-", dir=tmp_dir)
+        self.runs = []
+        self._next_run = 0
+        self._buffer = []
+        self._size = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def add(self, ids, counts=None):
+        """Count ids (each once, or counts[i] times)."""
+        ids = np.asarray(ids, dtype=np.int64)
+        if counts is None:
+            counts = np.ones(len(ids), dtype=np.int64)
+        self._buffer.append((ids, np.asarray(counts, dtype=np.int64)))
+        self._size += len(ids)
+        if self._size >= self.limit:
+            ids, counts = reduce_counts(
+                np.concatenate([b[0] for b in self._buffer]),
+                np.concatenate([b[1] for b in self._buffer]),
+            )
+            self._buffer = [(ids, counts)]
+            self._size = len(ids)
+            # still over budget once duplicates are folded: spill
+            if self._size >= self.limit // 2:
+                self.spill()
+
+    def spill(self):
+        """Write the buffer as one sorted run."""
+        if not self._buffer:
+            return
+        ids, counts = reduce_counts(
+            np.concatenate([b[0] for b in self._buffer]),
+            np.concatenate([b[1] for b in self._buffer]),
+        )
+        self._buffer, self._size = [], 0
+        self.runs.append(self._write_run([(ids, counts)]))
+
+    def _write_run(self, blocks):
+        """Append sorted blocks to a new run: raw ids and counts files."""
+        path = os.path.join(self.tmp_dir, f"run{self._next_run:06d}")
+        self._next_run += 1
+        size = 0
+        with open(path + ".ids", "wb") as fi, \
+                open(path + ".counts", "wb") as fc:
+            for ids, counts in blocks:
+                ids.tofile(fi)
+                counts.tofile(fc)
+                size += len(ids)
+        return path, size
+
+    def _open(self, runs):
+        """(ids, counts) memory maps of runs."""
+        return [
+            tuple(np.memmap(f"{path}.{part}", dtype=np.int64, mode="r",
+                            shape=(size,))
+                  if size else np.zeros(0, dtype=np.int64)
+                  for part in ("ids", "counts"))
+            for path, size in runs
+        ]
+
+    def _remove(self, runs):
+        for path, _ in runs:
+            os.remove(path + ".ids")
+            os.remove(path + ".counts")
+
+    def merge(self):
+        """Sorted, summed (ids, counts) blocks of everything added.
+
+        When there are too many runs to read a block of each within
+        the budget, groups of runs are first merged into longer ones.
+        """
+        if not self.runs:
+            ids, counts = reduce_counts(
+                np.concatenate([b[0] for b in self._buffer] or [[]]),
+                np.concatenate([b[1] for b in self._buffer] or [[]]),
+            )
+            if len(ids):
+                yield ids, counts
+            return
+        self.spill()
+        fan_in = max(2, self.memory // (PAIR_BYTES * MIN_BLOCK))
+        while len(self.runs) > fan_in:
+            runs, self.runs = self.runs, []
+            for start in range(0, len(runs), fan_in):
+                group = runs[start:start + fan_in]
+                self.runs.append(self._write_run(
+                    merge_runs(self._open(group), MIN_BLOCK)
+                ))
+                self._remove(group)
+        block = max(MIN_BLOCK, self.limit // len(self.runs) // 4)
+        yield from merge_runs(self._open(self.runs), block)
+
+    def write_store(self, path, alphabet, n, pad=False):
+        """Merge every run into a count store readable by CountStore."""
+        space = max(alphabet.size, 1) ** n
+        if space <= DENSE_STORE_LIMIT:
+            dense = np.zeros(space, dtype=np.int64)
+            for ids, counts in self.merge():
+                dense[ids] = counts
+            ids = np.flatnonzero(dense)
+            write_count_arrays(path, ids, dense[ids], alphabet, n, pad)
+            return
+        # the merged table goes to disk first, then is copied into the
+        # store from memory maps rather than held in memory
+        (ids, counts), = self._open([self._write_run(self.merge())])
+        write_count_arrays(path, ids, counts, alphabet, n, pad,
+                           presorted=True)
+
+
+def scan_alphabet(batches):
+    """Alphabet (with SEP) of every character in lower-cased batches."""
+    seen = np.zeros(0, dtype=bool)
+    for names in batches:
+        points = code_points("".join(names).lower())
+        if len(points):
+            top = int(points.max()) + 1
+            if top > len(seen):
+                seen = np.concatenate([seen, np.zeros(top - len(seen), bool)])
+            seen[points] = True
+    chars = "".join(map(chr, np.flatnonzero(seen)))
+    return Alphabet(SEP + chars)
+
+
+def count_to_store(batches, path, n=2, pad=False, alphabet=None,
+                   memory=DEFAULT_MEMORY, tmp_dir=None):
+    """Count n-grams of name batches into a count store within memory.
+
+    Ids are packed over one fixed alphabet, so it has to be known up
+    front: pass it, or pass batches that can be iterated twice (a
+    list, or a function returning a fresh iterator) and it is found
+    in a first scan. A one-shot iterator without an alphabet is a
+    TypeError, since the scan would use it up.
+    """
+    if alphabet is None:
+        if not callable(batches) and iter(batches) is batches:
+            raise TypeError("batches is a one-shot iterator: pass an "
+                            "alphabet, a list or a function returning "
+                            "fresh batches")
+        make = batches if callable(batches) else (lambda: batches)
+        alphabet = scan_alphabet(make())
+        batches = make()
+    elif callable(batches):
+        batches = batches()
+    pad_chars = "^$" if pad else ""
+    if pad_chars and any(c not in alphabet for c in pad_chars):
+        alphabet = Alphabet(alphabet.chars + pad_chars)
+    base = max(alphabet.size, 1)
+    if base ** n >= 2 ** 63:
+        raise ValueError(f"alphabet of {alphabet.size} characters is too "
+                         f"large to pack {n}-grams into 64-bit ids")
+    with ExternalCounter(memory, tmp_dir) as counter:
+        for names in batches:
+            counter.add(ngram_ids(names, n, pad, alphabet)[0])
+        counter.write_store(path, alphabet, n, pad)
+    return alphabet
+
+
+def count_file_to_store(path, filepath=None, n=2, pad=False, lang=None,
+                        memory=DEFAULT_MEMORY, tmp_dir=None):
+    """count_to_store over a data file, read twice in batches."""
+    from .utils import iter_names
+
+    return count_to_store(lambda: iter_names(filepath, lang), path, n, pad,
+                          memory=memory, tmp_dir=tmp_dir)
@@ -0,0 +1,261 @@
+"""Per-name character n-gram index shared by the LM and logistic paths.
+
+Every name is encoded once into the packed ids of its n-grams, CSR
+style: for each order n, the n-grams of row i are
+ids[n][indptr[n][i]:indptr[n][i + 1]], in name order. Bigram LM counts
+and the CountVectorizer(analyzer="char") feature matrix of any subset
+of rows are then assembled by slicing and counting ids, without
+looking at the text again. The index of a name list is cached on disk,
+and appending names encodes only the new rows.
+
+Names are indexed lower-cased and otherwise as given, so lengths and
+n-gram counts match count_lm and compute_frequencies on any input.
+CountVectorizer also collapses runs of whitespace to one space; the
+few names where that changes the text keep their collapsed form on
+the side, and feature_matrix counts it in place of their indexed ids.
+"""
+import hashlib
+import os
+from collections import Counter
+
+import numpy as np
+
+from . import instrument
+from .artifact import load_artifact, save_artifact
+from .logistic import WHITESPACE
+from .ngrams import (
+    Alphabet, SEP, code_points, count_ids, ngram_ids, unpack_ids,
+)
+from .preprocess import CACHE_DIR
+
+
+ORDERS = (1, 2, 3)
+
+# bump when the ids a cached index holds would change
+INDEX_VERSION = 2
+
+
+def collapse(name):
+    """name as CountVectorizer's char analyzer sees it after lowering."""
+    return WHITESPACE.sub(" ", name)
+
+
+def _repack(ids, base, n, remap, new_base):
+    """Packed ids over base re-packed over new_base, codes mapped by remap."""
+    codes = remap[unpack_ids(ids, base, n)]
+    packed = np.zeros(len(ids), dtype=np.int64)
+    for j in range(n):
+        packed = packed * new_base + codes[:, j]
+    return packed
+
+
+class FeatureIndex:
+    """Packed n-gram ids of every name, row by row, for several orders.
+
+    Rows are addressed by position in the indexed name list, so a
+    train/test split of row numbers (np.arange(len(names)) passed to
+    train_test_split alongside the names) selects the same names.
+    """
+
+    def __init__(self, alphabet, orders, lengths, indptr, ids,
+                 collapsed=None):
+        self.alphabet = alphabet
+        self.base = max(alphabet.size, 1)
+        self.orders = tuple(orders)
+        self.lengths = lengths
+        self.indptr = indptr
+        self.ids = ids
+        # row -> collapsed text, for rows with whitespace runs
+        self.collapsed = collapsed or {}
+
+    @classmethod
+    def from_names(cls, names, orders=ORDERS):
+        index = cls(Alphabet(SEP), orders, np.zeros(0, dtype=np.int64),
+                    {n: np.zeros(1, dtype=np.int64) for n in orders},
+                    {n: np.zeros(0, dtype=np.int64) for n in orders})
+        index.append(names)
+        return index
+
+    def __len__(self):
+        return len(self.lengths)
+
+    def append(self, names):
+        """Index names as new rows; returns their row numbers.
+
+        Only the new names are encoded. When they bring characters the
+        alphabet lacks, the ids already stored are re-packed over the
+        grown alphabet, which is arithmetic on the ids alone.
+        """
+        names = [name.lower() for name in names]
+        start = len(self.lengths)
+        collapsed = {start + i: collapse(name)
+                     for i, name in enumerate(names)
+                     if WHITESPACE.search(name)}
+        chars = (set("".join(names)) | set("".join(collapsed.values()))) \
+            - set(self.alphabet.chars)
+        if chars:
+            alphabet = Alphabet(self.alphabet.chars + "".join(chars))
+            remap = alphabet.encode(self.alphabet.chars)
+            for n in self.orders:
+                self.ids[n] = _repack(self.ids[n], self.base, n, remap,
+                                      alphabet.size)
+            self.alphabet, self.base = alphabet, alphabet.size
+        lengths = np.fromiter(map(len, names), dtype=np.int64,
+                              count=len(names))
+        for n in self.orders:
+            ids, _ = ngram_ids(names, n, False, self.alphabet)
+            windows = np.maximum(lengths - n + 1, 0)
+            self.ids[n] = np.concatenate([self.ids[n], ids])
+            self.indptr[n] = np.concatenate(
+                [self.indptr[n], self.indptr[n][-1] + np.cumsum(windows)]
+            )
+        self.collapsed.update(collapsed)
+        self.lengths = np.concatenate([self.lengths, lengths])
+        return np.arange(start, len(self.lengths))
+
+    def gather(self, n, rows=None):
+        """(ids, row positions) of the order-n n-grams of rows, in order.
+
+        Row positions count from 0 within rows.
+        """
+        if n not in self.ids:
+            raise ValueError(f"order {n} is not indexed "
+                             f"(orders: {self.orders})")
+        indptr = np.asarray(self.indptr[n])
+        if rows is None:
+            counts = np.diff(indptr)
+            return (np.asarray(self.ids[n]),
+                    np.repeat(np.arange(len(counts)), counts))
+        rows = np.asarray(rows, dtype=np.int64)
+        starts = indptr[rows]
+        counts = indptr[rows + 1] - starts
+        # every gathered id sits at its row's start plus its offset
+        # within the row
+        skip = np.repeat(starts - (np.cumsum(counts) - counts), counts)
+        pos = np.arange(int(counts.sum())) + skip
+        return (np.asarray(self.ids[n])[pos],
+                np.repeat(np.arange(len(rows)), counts))
+
+    def counts(self, n, rows=None):
+        """compute_frequencies(names of rows, n) from the index."""
+        ids, _ = self.gather(n, rows)
+        uniq, counts = count_ids(ids, self.base ** n)
+        grams = self.alphabet.decode(unpack_ids(uniq, self.base, n))
+        return Counter(dict(zip(grams, counts.tolist())))
+
+    def lm_counts(self, rows=None):
+        """count_lm(names of rows): bigram and context counts."""
+        if rows is None:
+            rows = np.arange(len(self))
+        rows = np.asarray(rows, dtype=np.int64)
+        long_rows = rows[self.lengths[rows] >= 2]
+        return self.counts(2, rows), self.counts(1, long_rows)
+
+    def _gather_collapsed(self, n, rows=None):
+        """gather(n, rows), with the n-grams of rows that have
+        whitespace runs taken from their collapsed text instead."""
+        ids, owner = self.gather(n, rows)
+        if not self.collapsed:
+            return ids, owner
+        row_ids = np.arange(len(self)) if rows is None else np.asarray(rows)
+        pos = np.flatnonzero(np.isin(row_ids, list(self.collapsed)))
+        if not len(pos):
+            return ids, owner
+        texts = [self.collapsed[int(row)] for row in row_ids[pos]]
+        extra, _ = ngram_ids(texts, n, False, self.alphabet)
+        windows = np.maximum(np.fromiter(map(len, texts), dtype=np.int64,
+                                         count=len(texts)) - n + 1, 0)
+        keep = ~np.isin(owner, pos)
+        return (np.concatenate([ids[keep], extra]),
+                np.concatenate([owner[keep], np.repeat(pos, windows)]))
+
+    def feature_matrix(self, rows=None, ngram_range=(2, 2)):
+        """(vocabulary, X) of rows: CountVectorizer(analyzer="char",
+        ngram_range).fit_transform(names of rows) and its sorted
+        feature names, assembled from the indexed ids."""
+        from scipy.sparse import csr_matrix
+
+        low, high = ngram_range
+        parts, owners, offsets, offset = [], [], {}, 0
+        for n in range(low, high + 1):
+            ids, owner = self._gather_collapsed(n, rows)
+            # each order gets its own block of the id space
+            offsets[n] = offset
+            parts.append(ids + offset)
+            owners.append(owner)
+            offset += self.base ** n
+        if offset >= 2 ** 63:
+            raise ValueError(f"alphabet of {self.alphabet.size} characters "
+                             f"is too large to pack {high}-grams together")
+        ids, owner = np.concatenate(parts), np.concatenate(owners)
+        vocab, column = np.unique(ids, return_inverse=True)
+        grams = []
+        for n in range(low, high + 1):
+            block = vocab[(vocab >= offsets[n])
+                          & (vocab < offsets[n] + self.base ** n)]
+            grams += self.alphabet.decode(
+                unpack_ids(block - offsets[n], self.base, n)
+            )
+        grams = np.array(grams, dtype=str)
+        order = np.argsort(grams, kind="stable")
+        rank = np.empty_like(order)
+        rank[order] = np.arange(len(order))
+        width = len(vocab)
+        height = len(self) if rows is None else len(rows)
+        cells, counts = np.unique(owner * width + rank[column],
+                                  return_counts=True)
+        X = csr_matrix((counts, np.divmod(cells, width)),
+                       shape=(height, width), dtype=np.int64)
+        return grams[order], X
+
+    def save(self, path):
+        arrays = {"lengths": self.lengths}
+        for n in self.orders:
+            arrays[f"indptr{n}"] = self.indptr[n]
+            arrays[f"ids{n}"] = self.ids[n]
+        save_artifact(path, "feature_index", {
+            "alphabet": self.alphabet.chars, "orders": list(self.orders),
+            "index_version": INDEX_VERSION,
+            "collapsed": sorted(self.collapsed.items()),
+        }, arrays)
+
+    @classmethod
+    def load(cls, path, mmap=True, verify=True):
+        meta, arrays = load_artifact(path, "feature_index", mmap, verify)
+        if meta.get("index_version") != INDEX_VERSION:
+            raise ValueError(f"{path} has index version "
+                             f"{meta.get('index_version')}, expected "
+                             f"{INDEX_VERSION}")
+        orders = meta["orders"]
+        return cls(Alphabet(meta["alphabet"]), orders, arrays["lengths"],
+                   {n: arrays[f"indptr{n}"] for n in orders},
+                   {n: arrays[f"ids{n}"] for n in orders},
+                   {row: text for row, text in meta.get("collapsed", [])})
+
+
+def index_path(names, orders=ORDERS, cache_dir=CACHE_DIR):
+    """Cache file for the index of exactly these names and orders."""
+    digest = hashlib.sha256(f"{INDEX_VERSION}:{list(orders)}:".encode())
+    digest.update(code_points(SEP.join(names)).tobytes())
+    return os.path.join(cache_dir, digest.hexdigest()[:32] + ".features")
+
+
+def load_index(names, orders=ORDERS, cache_dir=CACHE_DIR):
+    """FeatureIndex of names, loaded from the cache when it was built
+    before for the same names; cache_dir=None skips the cache."""
+    names = list(names)
+    if cache_dir is None:
+        return FeatureIndex.from_names(names, orders)
+    path = index_path(names, orders, cache_dir)
+    if os.path.exists(path):
+        try:
+            index = FeatureIndex.load(path)
+            instrument.count("feature_cache_hits")
+            return index
+        except ValueError:
+            pass
+    instrument.count("feature_cache_misses")
+    index = FeatureIndex.from_names(names, orders)
+    os.makedirs(cache_dir, exist_ok=True)
+    index.save(path)
+    return index
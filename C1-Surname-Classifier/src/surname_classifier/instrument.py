@@ -0,0 +1,182 @@
+"""Opt-in stage timers and counters for the training and scoring paths.
+
+    from . import instrument
+    instrument.enable()
+    ...                                   # train, score
+    print(instrument.to_prometheus())
+
+Disabled, which is the default, a timed function costs one flag check
+per call and count() returns at once, so the hooks stay in the hot
+paths. Setting SURNAMES_METRICS=path turns them on for any script and
+dumps the metrics there on exit (.prom for Prometheus text, otherwise
+JSON).
+"""
+import atexit
+import contextlib
+import functools
+import json
+import os
+import sys
+import time
+
+
+ENABLED = False
+
+# stage -> [calls, total seconds, slowest call]
+_timers = {}
+_counters = {}
+
+
+def enable(on=True):
+    global ENABLED
+    ENABLED = on
+
+
+def reset():
+    _timers.clear()
+    _counters.clear()
+
+
+def count(name, value=1):
+    """Add value to counter name."""
+    if ENABLED:
+        _counters[name] = _counters.get(name, 0) + value
+
+
+def _record(stage, seconds):
+    timer = _timers.setdefault(stage, [0, 0.0, 0.0])
+    timer[0] += 1
+    timer[1] += seconds
+    timer[2] = max(timer[2], seconds)
+
+
+@contextlib.contextmanager
+def _timing(stage):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _record(stage, time.perf_counter() - start)
+
+
+def timer(stage):
+    """Context manager timing its block as one call of stage."""
+    return _timing(stage) if ENABLED else contextlib.nullcontext()
+
+
+def timed(stage):
+    """Decorator timing every call of a function as stage.
+
+    Nested timed calls are each recorded, so a stage's time includes
+    the stages it calls.
+    """
+    def wrap(fn):
+        @functools.wraps(fn)
+        def inner(*args, **kwargs):
+            if not ENABLED:
+                return fn(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                _record(stage, time.perf_counter() - start)
+        return inner
+    return wrap
+
+
+def snapshot():
+    """{"timers": {stage: {calls, seconds, max_seconds}}, "counters": {}}."""
+    return {
+        "timers": {
+            stage: {"calls": calls, "seconds": total, "max_seconds": top}
+            for stage, (calls, total, top) in sorted(_timers.items())
+        },
+        "counters": dict(sorted(_counters.items())),
+    }
+
+
+def to_json(metrics=None):
+    return json.dumps(metrics or snapshot(), indent=2)
+
+
+def to_prometheus(metrics=None, prefix="surnames"):
+    """Metrics in the Prometheus text exposition format."""
+    metrics = metrics or snapshot()
+    lines = []
+    for metric, kind, key in (
+        ("stage_calls_total", "counter", "calls"),
+        ("stage_seconds_total", "counter", "seconds"),
+        ("stage_max_seconds", "gauge", "max_seconds"),
+    ):
+        lines.append(f"# TYPE {prefix}_{metric} {kind}")
+        lines += [f'{prefix}_{metric}{{stage="{stage}"}} {timer[key]}'
+                  for stage, timer in metrics["timers"].items()]
+    for name, value in metrics["counters"].items():
+        kind = "gauge" if name.endswith("_bytes") else "counter"
+        suffix = "" if kind == "gauge" else "_total"
+        lines.append(f"# TYPE {prefix}_{name}{suffix} {kind}")
+        lines.append(f"{prefix}_{name}{suffix} {value}")
+    return "\n".join(lines) + "\n"
+
+
+def dump(path, fmt=None):
+    """Write the metrics to path ("-" for stdout).
+
+    fmt is "json" or "prometheus"; by default a .prom or .txt path
+    gets Prometheus text and anything else JSON.
+    """
+    if fmt is None:
+        fmt = ("prometheus" if path.endswith((".prom", ".txt"))
+               else "json")
+    if fmt not in ("json", "prometheus"):
+        raise ValueError(f"unknown metrics format {fmt!r}")
+    text = to_json() if fmt == "json" else to_prometheus()
+    if path == "-":
+        sys.stdout.write(text if text.endswith("\n") else text + "\n")
+        return
+    with open(path, "w") as f:
+        f.write(text)
+
+
+@contextlib.contextmanager
+def capture(profile=None, memory=False, top=20):
+    """Profile and/or trace allocations of the enclosed block.
+
+    profile is a path for the cProfile stats (read them with pstats or
+    snakeviz); the top functions by cumulative time are also printed
+    to stderr. With memory, tracemalloc records the peak as the
+    peak_traced_bytes counter and prints the top allocation sites.
+    """
+    profiler = None
+    if profile:
+        import cProfile
+        profiler = cProfile.Profile()
+    if memory:
+        import tracemalloc
+        tracemalloc.start()
+    if profiler:
+        profiler.enable()
+    try:
+        yield
+    finally:
+        if profiler:
+            import pstats
+            profiler.disable()
+            profiler.dump_stats(profile)
+            print(f"Profile saved to {profile}", file=sys.stderr)
+            pstats.Stats(profiler, stream=sys.stderr).sort_stats(
+                "cumulative").print_stats(top)
+        if memory:
+            peak = tracemalloc.get_traced_memory()[1]
+            stats = tracemalloc.take_snapshot().statistics("lineno")
+            tracemalloc.stop()
+            _counters["peak_traced_bytes"] = peak
+            print(f"Peak traced memory: {peak / 2 ** 20:.1f} MB",
+                  file=sys.stderr)
+            for stat in stats[:top]:
+                print(f"  {stat}", file=sys.stderr)
+
+
+if os.environ.get("SURNAMES_METRICS"):
+    enable()
+    atexit.register(dump, os.environ["SURNAMES_METRICS"])
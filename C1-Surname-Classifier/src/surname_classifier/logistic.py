@@ -0,0 +1,177 @@
+import re
+
+import numpy as np
+
+from .artifact import load_artifact, save_artifact
+from .ngrams import Alphabet, SEP, code_points, valid_windows, window_ids
+
+
+# CountVectorizer collapses whitespace runs before taking char n-grams
+WHITESPACE = re.compile(r"\s\s+")
+
+
+class LogisticModel:
+    """A fitted char n-gram logistic regression, scored with numpy only.
+
+    Holds what inference needs from a CountVectorizer/LogisticRegression
+    pair (vocabulary, coef_, intercept_, classes_) and reproduces their
+    decision scores and predictions exactly (probabilities to within
+    float rounding), so a saved model loads without scikit-learn.
+
+    Vocabulary n-grams are packed into integer ids once, so featurizing
+    a batch is an encode, one sliding-window pass per n-gram order and a
+    sorted lookup, instead of building and validating a sparse matrix.
+    """
+
+    def __init__(self, vocabulary, coef, intercept, classes,
+                 ngram_range=(2, 2), lowercase=True):
+        self.vocabulary = vocabulary
+        self.coef = coef
+        self.intercept = intercept
+        self.classes = classes
+        self.ngram_range = tuple(ngram_range)
+        self.lowercase = lowercase
+        self._index_vocabulary()
+
+    def _index_vocabulary(self):
+        grams = [str(gram) for gram in self.vocabulary]
+        self.alphabet = Alphabet(SEP + "".join(grams))
+        self.base = self.alphabet.size
+        low, high = self.ngram_range
+        # n-grams of each order get their own block of the id space
+        self._offsets, offset = {}, 0
+        for n in range(low, high + 1):
+            self._offsets[n] = offset
+            offset += self.base ** n
+        if offset >= 2 ** 63:
+            raise ValueError(
+                f"alphabet of {self.base} characters is too large to "
+                f"pack {high}-grams into 64-bit ids"
+            )
+        lengths = np.array([len(gram) for gram in grams], dtype=np.int64)
+        ids = np.zeros(len(grams), dtype=np.int64)
+        for n in range(low, high + 1):
+            which = np.flatnonzero(lengths == n)
+            text = "".join(grams[i] for i in which)
+            codes = self.alphabet.encode(text).reshape(-1, n)
+            packed = np.full(len(which), self._offsets[n], dtype=np.int64)
+            for j in range(n):
+                packed += codes[:, j] * self.base ** (n - 1 - j)
+            ids[which] = packed
+        order = np.argsort(ids, kind="stable")
+        self._ids = ids[order]
+        self._id_columns = order
+
+    @classmethod
+    def from_sklearn(cls, vectorizer, model):
+        """Export a fitted CountVectorizer(analyzer="char") and model."""
+        if getattr(vectorizer, "vocabulary_", None) is None:
+            raise ValueError("only fitted CountVectorizers can be exported")
+        if vectorizer.analyzer != "char":
+            raise ValueError("only char n-gram vectorizers are supported")
+        return cls(
+            np.asarray(vectorizer.get_feature_names_out(), dtype=str),
+            np.asarray(model.coef_, dtype=np.float64),
+            np.asarray(model.intercept_, dtype=np.float64),
+            np.asarray(model.classes_, dtype=str),
+            vectorizer.ngram_range, vectorizer.lowercase,
+        )
+
+    @classmethod
+    def from_features(cls, vocabulary, model, ngram_range=(2, 2)):
+        """Export a model fitted on FeatureIndex.feature_matrix columns."""
+        return cls(
+            np.asarray(vocabulary, dtype=str),
+            np.asarray(model.coef_, dtype=np.float64),
+            np.asarray(model.intercept_, dtype=np.float64),
+            np.asarray(model.classes_, dtype=str), ngram_range,
+        )
+
+    def preprocess(self, name):
+        if self.lowercase:
+            name = name.lower()
+        return WHITESPACE.sub(" ", name)
+
+    def analyze(self, name):
+        """The char n-grams CountVectorizer(analyzer="char") emits."""
+        name = self.preprocess(name)
+        low, high = self.ngram_range
+        return [name[i:i + n]
+                for n in range(low, min(high, len(name)) + 1)
+                for i in range(len(name) - n + 1)]
+
+    def features(self, names):
+        """(rows, columns, counts) of the in-vocabulary n-grams of names.
+
+        The COO triple of vectorizer.transform(names), one entry per
+        row and distinct n-gram, sorted by row then column.
+        """
+        names = [self.preprocess(name) for name in names]
+        points = code_points(SEP.join(names))
+        codes = self.alphabet.encode_points(points)
+        # unknown characters cannot be part of a vocabulary n-gram
+        stop = (codes < 0) | (codes == self.alphabet.index(SEP))
+        row_of = np.cumsum(points == ord(SEP))
+        rows, ids = [], []
+        low, high = self.ngram_range
+        for n in range(low, high + 1):
+            keep = valid_windows(stop, n)
+            ids.append(window_ids(codes, self.base, n)[keep]
+                       + self._offsets[n])
+            rows.append(row_of[:len(keep)][keep])
+        ids, rows = np.concatenate(ids), np.concatenate(rows)
+        pos = np.minimum(np.searchsorted(self._ids, ids), len(self._ids) - 1)
+        hit = self._ids[pos] == ids
+        width = len(self._ids)
+        cells, counts = np.unique(
+            rows[hit] * width + self._id_columns[pos[hit]],
+            return_counts=True,
+        )
+        rows, cols = np.divmod(cells, width)
+        return rows, cols, counts
+
+    def decision_function(self, names):
+        names = list(names)
+        rows, cols, counts = self.features(names)
+        # bincount adds in (row, column) order: the same float
+        # operations as the CSR product X @ coef_.T
+        scores = np.column_stack([
+            np.bincount(rows, weights=counts * weights[cols],
+                        minlength=len(names))
+            for weights in np.asarray(self.coef)
+        ]) + self.intercept
+        return scores.ravel() if scores.shape[1] == 1 else scores
+
+    def predict_proba(self, names):
+        scores = self.decision_function(names)
+        if scores.ndim == 1:
+            positive = 1 / (1 + np.exp(-scores))
+            return np.column_stack([1 - positive, positive])
+        scores = scores - scores.max(axis=1, keepdims=True)
+        probs = np.exp(scores)
+        return probs / probs.sum(axis=1, keepdims=True)
+
+    def predict(self, names):
+        scores = self.decision_function(names)
+        if scores.ndim == 1:
+            return self.classes[(scores > 0).astype(int)]
+        return self.classes[scores.argmax(axis=1)]
+
+    def save(self, path):
+        meta = {
+            "ngram_range": list(self.ngram_range),
+            "lowercase": self.lowercase,
+        }
+        save_artifact(path, "logistic", meta, {
+            "vocabulary": self.vocabulary, "coef": self.coef,
+            "intercept": self.intercept, "classes": self.classes,
+        })
+
+    @classmethod
+    def load(cls, path, mmap=True, verify=True):
+        meta, arrays = load_artifact(path, "logistic", mmap, verify)
+        return cls(
+            arrays["vocabulary"], arrays["coef"], arrays["intercept"],
+            np.asarray(arrays["classes"]),
+            meta["ngram_range"], meta["lowercase"],
+        )
@@ -0,0 +1,83 @@
+import json
+import os
+
+from .bigram_lm import BigramLM
+from .logistic import LogisticModel
+from .utils import LANGUAGES
+
+
+MODEL_FILES = {
+    "English": "english.lm", "Russian": "russian.lm",
+    "complete": "complete.lm", "logistic": "logistic.model",
+}
+
+
+# the languages a directory has classifier LMs for, in training order
+LANGUAGE_FILE = "languages.json"
+
+
+def model_file(key):
+    """File name of a saved model; other languages get <language>.lm."""
+    return MODEL_FILES.get(key, key.lower() + ".lm")
+
+
+def saved_languages(directory):
+    """Languages with a saved classifier LM in directory.
+
+    Directories saved before the language list was written have at most
+    the default pair.
+    """
+    path = os.path.join(directory, LANGUAGE_FILE)
+    if os.path.exists(path):
+        with open(path) as f:
+            return json.load(f)
+    return [lang for lang in LANGUAGES
+            if os.path.exists(os.path.join(directory, model_file(lang)))]
+
+
+def save_models(directory, filepath=None, k=1.0, logistic=True,
+                languages=LANGUAGES, clean=False, bloom=None):
+    """Train every servable model once and write them to directory.
+
+    One classifier LM is written per language (every label in the file
+    when languages is None), all over one alphabet. Training imports
+    the counting code (and scikit-learn for the logistic model);
+    loading them back needs neither.
+    """
+    from .classifier import build_vectorizer, train_logistic
+    from .task4_smoothing import build_lms
+    from .utils import load_data
+
+    names, labels = load_data(filepath, languages, clean, bloom)
+    os.makedirs(directory, exist_ok=True)
+    lms = build_lms(names, labels, k=k, languages=languages)
+    for lang, lm in lms.items():
+        lm.save(os.path.join(directory, model_file(lang)))
+    with open(os.path.join(directory, LANGUAGE_FILE), "w") as f:
+        json.dump(list(lms), f)
+    if "English" in lms:
+        eng = [n for n, l in zip(names, labels) if l == "English"]
+        BigramLM.from_names(eng, k=0.0, pad=True, unseen=1e-10).save(
+            os.path.join(directory, model_file("complete")))
+    if logistic:
+        vectorizer, X = build_vectorizer(names)
+        model = train_logistic(X, labels)
+        LogisticModel.from_sklearn(vectorizer, model).save(
+            os.path.join(directory, model_file("logistic")))
+
+
+def load_models(directory, keys=None, verify=True):
+    """{key: model} for the saved models in directory (all by default)."""
+    loaders = {"logistic": LogisticModel.load}
+    every = keys is None
+    if every:
+        keys = saved_languages(directory) + [
+            key for key in MODEL_FILES if key not in LANGUAGES
+        ]
+    models = {}
+    for key in keys:
+        path = os.path.join(directory, model_file(key))
+        if every and not os.path.exists(path):
+            continue
+        models[key] = loaders.get(key, BigramLM.load)(path, verify=verify)
+    return models
@@ -0,0 +1,371 @@
+import numpy as np
+
+from .artifact import load_artifact, save_artifact
+from .bigram_lm import CHUNK_SIZE
+from .ngrams import (
+    Alphabet, BOS, SEP, encode_batch, join_names, valid_windows, window_ids,
+)
+
+
+MAX_ORDER = 5
+METHODS = ("kneser_ney", "katz", "stupid_backoff")
+# orders whose id space is at most this big get a dense id -> row index
+DENSE_INDEX_LIMIT = 1 << 20
+
+
+def count_orders(names, order, alphabet):
+    """Sorted (ids, counts) of every n-gram order 1..order.
+
+    Names are padded with order - 1 BOS characters and one EOS, and an
+    n-gram is counted wherever its last character is a prediction
+    target (anything but BOS), so each order sees the same targets.
+    """
+    base = alphabet.size + 1
+    codes = alphabet.encode(join_names(names, order, pad=True))
+    # SEP is not in the alphabet, so it encodes to -1 like unknowns
+    stop = codes < 0
+    target = codes != alphabet.index(BOS)
+    tables = []
+    for n in range(1, order + 1):
+        keep = valid_windows(stop, n) & target[n - 1:]
+        ids = window_ids(codes, base, n)[keep]
+        tables.append(np.unique(ids, return_counts=True))
+    return tables
+
+
+def group_contexts(ids, base):
+    """Contexts of sorted n-gram ids: (contexts, group of each id, starts)."""
+    contexts, starts, group = np.unique(
+        ids // base, return_index=True, return_inverse=True
+    )
+    return contexts, group, starts
+
+
+def lookup(sorted_ids, ids):
+    """Row of each id in sorted_ids and whether it was found."""
+    if not len(sorted_ids):
+        return np.zeros(len(ids), dtype=np.int64), np.zeros(len(ids), bool)
+    pos = np.searchsorted(sorted_ids, ids)
+    pos = np.minimum(pos, len(sorted_ids) - 1)
+    return pos, sorted_ids[pos] == ids
+
+
+def smoothed_unigrams(counts, base, discount=None):
+    """Dense P(w) over every code; the OOV code gets a share of the mass.
+
+    With a discount it is the interpolated Kneser-Ney bottom level,
+    otherwise add-one over the seen targets plus OOV.
+    """
+    ids, values = counts
+    seen = len(ids) + 1
+    probs = np.zeros(base)
+    if discount is None:
+        probs[ids] = values + 1.0
+        probs[base - 1] = 1.0
+        return probs / (values.sum() + seen)
+    total = values.sum()
+    gamma = discount * len(ids) / total
+    probs[ids] = np.maximum(values - discount, 0) / total + gamma / seen
+    probs[base - 1] = gamma / seen
+    return probs
+
+
+def absolute_discount(values):
+    """D = n1 / (n1 + 2 n2) from the counts of counts of one order."""
+    n1 = np.count_nonzero(values == 1)
+    n2 = np.count_nonzero(values == 2)
+    if n1 == 0 or n2 == 0:
+        return 0.5
+    return n1 / (n1 + 2 * n2)
+
+
+def good_turing_ratios(values, k=5):
+    """Katz discount ratio d_r for r = 0..k (d_r = 1 above k).
+
+    Falls back to an absolute discount of 0.5 for any r whose
+    Good-Turing estimate is not in (0, 1], which happens when the
+    counts of counts are sparse.
+    """
+    n = np.bincount(values, minlength=k + 2)[:k + 2].astype(float)
+    ratios = np.ones(k + 1)
+    r = np.arange(1, k + 1)
+    fallback = (r - 0.5) / r
+    if n[1] == 0:
+        ratios[1:] = fallback
+        return ratios
+    cut = (k + 1) * n[k + 1] / n[1]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        star = (r + 1) * n[r + 1] / n[r]
+        d = (star / r - cut) / (1 - cut)
+    ok = np.isfinite(d) & (d > 0) & (d <= 1)
+    ratios[1:] = np.where(ok, d, fallback)
+    return ratios
+
+
+class NgramLM:
+    """Character n-gram LM of order 1..5 stored in backoff (ARPA) form.
+
+    For every order n the seen n-grams are kept as sorted packed ids
+    with log P(w | h) next to them, and every seen context h has a log
+    backoff weight. Scoring a character is then a chain of lookups:
+
+        log P(w | h) = log_probs[hw]                       if hw seen
+                     = backoff[h] + log P(w | h[1:])       otherwise
+
+    with backoff[h] = unseen_backoff when h was never a context.
+    Kneser-Ney, Katz and stupid backoff only differ in the tables,
+    which are computed once in from_names.
+    """
+
+    def __init__(self, alphabet, order, ids, log_probs, contexts, backoffs,
+                 method="kneser_ney", unseen_backoff=0.0):
+        self.alphabet = alphabet
+        self.oov = alphabet.size
+        self.base = alphabet.size + 1
+        self.order = order
+        self.method = method
+        self.ids = ids
+        self.log_probs = log_probs
+        self.contexts = contexts
+        self.backoffs = backoffs
+        self.unseen_backoff = unseen_backoff
+        # small orders map ids straight to rows instead of searching
+        self._index = []
+        for n, table in enumerate(ids, 1):
+            index = None
+            if self.base ** n <= DENSE_INDEX_LIMIT:
+                index = np.full(self.base ** n, -1, dtype=np.int64)
+                index[table] = np.arange(len(table))
+            self._index.append(index)
+
+    @classmethod
+    def from_names(cls, names, order=3, method="kneser_ney", alpha=0.4,
+                   katz_k=5, counter=None):
+        """Count names and build the tables of one smoothing method.
+
+        counter(names, order, alphabet) supplies the per-order sorted
+        (ids, counts); count_orders by default, or a fixed-memory
+        approximation such as sketch.sketch_orders.
+        """
+        if not 1 <= order <= MAX_ORDER:
+            raise ValueError(f"order must be between 1 and {MAX_ORDER}, "
+                             f"got {order}")
+        if method not in METHODS:
+            raise ValueError(f"unknown smoothing method {method!r}")
+        names = list(names)
+        alphabet = Alphabet(join_names(names, order, pad=True)
+                            .replace(SEP, ""))
+        base = alphabet.size + 1
+        if base ** order >= 2 ** 63:
+            raise ValueError(
+                f"alphabet of {alphabet.size} characters is too large "
+                f"to pack {order}-grams into 64-bit ids"
+            )
+        tables = (counter or count_orders)(names, order, alphabet)
+        if method == "kneser_ney":
+            built = kneser_ney_tables(tables, base, alphabet.index(BOS))
+        elif method == "katz":
+            built = katz_tables(tables, base, katz_k)
+        else:
+            built = stupid_backoff_tables(tables, base, alpha)
+        probs, contexts, backoffs, unseen_backoff = built
+        ids = [np.arange(base)] + [table[0] for table in tables[1:]]
+        with np.errstate(divide="ignore"):
+            log_probs = [np.log(p) for p in probs]
+        return cls(alphabet, order, ids, log_probs, contexts, backoffs,
+                   method, unseen_backoff)
+
+    def _rows(self, n, ids):
+        index = self._index[n - 1]
+        if index is not None:
+            rows = index[ids]
+            return rows, rows >= 0
+        return lookup(self.ids[n - 1], ids)
+
+    def _context_backoffs(self, n, context_ids):
+        out = np.full(len(context_ids), self.unseen_backoff)
+        pos, hit = lookup(self.contexts[n - 2], context_ids)
+        out[hit] = self.backoffs[n - 2][pos[hit]]
+        return out
+
+    def target_log_probs(self, ngrams):
+        """log P of each target from the (order, m) matrix of its ids.
+
+        ngrams[j - 1] holds the packed order-j n-gram ending at each
+        target; lookups run from the highest order down and stop at the
+        first hit, carrying the backoff weights of the misses.
+        """
+        width = ngrams.shape[1]
+        out = np.zeros(width)
+        carried = np.zeros(width)
+        pending = np.arange(width)
+        for n in range(self.order, 0, -1):
+            ids = ngrams[n - 1, pending]
+            rows, hit = self._rows(n, ids)
+            found = pending[hit]
+            out[found] = carried[found] + self.log_probs[n - 1][rows[hit]]
+            pending = pending[~hit]
+            if not len(pending):
+                break
+            carried[pending] += self._context_backoffs(
+                n, ids[~hit] // self.base
+            )
+        return out
+
+    def encode_batch(self, names):
+        """(m, L) padded code matrix of names (unknown characters -> oov)."""
+        codes, lengths = encode_batch(names, self.alphabet, self.order,
+                                      pad=True)
+        return np.where(codes < 0, self.oov, codes), lengths
+
+    def _score_chunk(self, names):
+        codes, lengths = self.encode_batch(names)
+        start = self.order - 1
+        if codes.shape[1] <= start:
+            return np.zeros(len(names))
+        # row-major targets of every name: positions start..length-1
+        mask = np.arange(start, codes.shape[1]) < lengths[:, None]
+        rows = np.nonzero(mask)[0]
+        ngrams = np.empty((self.order, len(rows)), dtype=np.int64)
+        ids = codes[:, start:][mask]
+        ngrams[0] = ids
+        for n in range(2, self.order + 1):
+            shifted = codes[:, start - n + 1:codes.shape[1] - n + 1][mask]
+            ids = shifted * self.base ** (n - 1) + ids
+            ngrams[n - 1] = ids
+        return np.bincount(rows, weights=self.target_log_probs(ngrams),
+                           minlength=len(names))
+
+    def score_batch(self, names, chunk_size=CHUNK_SIZE):
+        """Log probabilities (EOS included) of many names as one array."""
+        names = list(names)
+        scores = np.zeros(len(names))
+        for start in range(0, len(names), chunk_size):
+            chunk = names[start:start + chunk_size]
+            scores[start:start + len(chunk)] = self._score_chunk(chunk)
+        return scores
+
+    def score(self, name):
+        return float(self._score_chunk([name])[0])
+
+    def save(self, path):
+        meta = {
+            "alphabet": self.alphabet.chars, "order": self.order,
+            "method": self.method, "unseen_backoff": self.unseen_backoff,
+        }
+        arrays = {}
+        for n in range(1, self.order + 1):
+            arrays[f"ids_{n}"] = self.ids[n - 1]
+            arrays[f"log_probs_{n}"] = self.log_probs[n - 1]
+            if n > 1:
+                arrays[f"contexts_{n}"] = self.contexts[n - 2]
+                arrays[f"backoffs_{n}"] = self.backoffs[n - 2]
+        save_artifact(path, "ngram_lm", meta, arrays)
+
+    @classmethod
+    def load(cls, path, mmap=True, verify=True):
+        meta, arrays = load_artifact(path, "ngram_lm", mmap, verify)
+        orders = range(1, meta["order"] + 1)
+        return cls(
+            Alphabet(meta["alphabet"]), meta["order"],
+            [arrays[f"ids_{n}"] for n in orders],
+            [arrays[f"log_probs_{n}"] for n in orders],
+            [arrays[f"contexts_{n}"] for n in orders if n > 1],
+            [arrays[f"backoffs_{n}"] for n in orders if n > 1],
+            meta["method"], meta["unseen_backoff"],
+        )
+
+
+def lower_order_probs(probs, tables, ids, base, n):
+    """Interpolation/backoff term P(w | h[1:]) for each order-n id."""
+    suffixes = ids % base ** (n - 1)
+    if n == 2:
+        return probs[0][suffixes]
+    pos, _ = lookup(tables[n - 2][0], suffixes)
+    return probs[n - 2][pos]
+
+
+def kneser_ney_tables(tables, base, bos=None):
+    """Interpolated Kneser-Ney with one absolute discount per order.
+
+    The highest order discounts raw counts; lower orders use
+    continuation counts (distinct left extensions), except n-grams that
+    start with the BOS code bos: nothing real precedes a name start, so
+    they keep their raw counts. A seen n-gram stores
+    the full interpolated probability and a context stores gamma(h), so
+    the backoff form reproduces the interpolated model exactly.
+    """
+    order = len(tables)
+    # KN counts: continuation counts below the top order
+    kn_counts = [tables[-1]]
+    for n in range(order - 1, 0, -1):
+        ids = tables[n - 1][0]
+        suffixes = tables[n][0] % base ** n
+        pos, _ = lookup(ids, suffixes)
+        # exact tables give every n-gram a left extension; pruned ones
+        # (sketch.sketch_orders) may not, and it still counts once
+        values = np.maximum(np.bincount(pos, minlength=len(ids)), 1)
+        if bos is not None:
+            starts = ids // base ** (n - 1) == bos
+            values = np.where(starts, tables[n - 1][1], values)
+        kn_counts.insert(0, (ids, values))
+
+    probs = [smoothed_unigrams(kn_counts[0], base,
+                               absolute_discount(kn_counts[0][1]))]
+    contexts, backoffs = [], []
+    for n in range(2, order + 1):
+        ids, values = kn_counts[n - 1]
+        discount = absolute_discount(values)
+        context_ids, group, starts = group_contexts(ids, base)
+        totals = np.add.reduceat(values, starts).astype(float)
+        types = np.diff(np.append(starts, len(ids)))
+        gamma = discount * types / totals
+        lower = lower_order_probs(probs, kn_counts, ids, base, n)
+        probs.append(np.maximum(values - discount, 0) / totals[group]
+                     + gamma[group] * lower)
+        contexts.append(context_ids)
+        backoffs.append(np.log(gamma))
+    return probs, contexts, backoffs, 0.0
+
+
+def katz_tables(tables, base, k=5):
+    """Katz backoff: Good-Turing discounted counts, renormalized alpha(h)."""
+    order = len(tables)
+    probs = [smoothed_unigrams(tables[0], base)]
+    contexts, backoffs = [], []
+    for n in range(2, order + 1):
+        ids, values = tables[n - 1]
+        ratios = good_turing_ratios(values, k)
+        discounted = values * ratios[np.minimum(values, k)]
+        discounted = np.where(values > k, values, discounted)
+        context_ids, group, starts = group_contexts(ids, base)
+        totals = np.add.reduceat(values, starts).astype(float)
+        p = discounted / totals[group]
+        lower = lower_order_probs(probs, tables, ids, base, n)
+        left = 1 - np.add.reduceat(p, starts)
+        lower_left = 1 - np.add.reduceat(lower, starts)
+        alpha = np.maximum(left, 1e-12) / np.maximum(lower_left, 1e-12)
+        probs.append(p)
+        contexts.append(context_ids)
+        backoffs.append(np.log(alpha))
+    return probs, contexts, backoffs, 0.0
+
+
+def stupid_backoff_tables(tables, base, alpha=0.4):
+    """Relative frequencies with a fixed alpha for every backoff step.
+
+    Scores are not normalized probabilities, but they rank names well
+    and need no discounting at all.
+    """
+    order = len(tables)
+    probs = [smoothed_unigrams(tables[0], base)]
+    contexts, backoffs = [], []
+    for n in range(2, order + 1):
+        ids, values = tables[n - 1]
+        _, group, starts = group_contexts(ids, base)
+        totals = np.add.reduceat(values, starts).astype(float)
+        probs.append(values / totals[group])
+        # every context, seen or not, backs off with the same weight
+        contexts.append(np.zeros(0, dtype=np.int64))
+        backoffs.append(np.zeros(0))
+    return probs, contexts, backoffs, float(np.log(alpha))
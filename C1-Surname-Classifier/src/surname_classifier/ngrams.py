@@ -0,0 +1,196 @@
+import numpy as np
+from collections import Counter
+
+from . import instrument
+
+
+BOS = "^"
+EOS = "$"
+# joins names into one buffer; windows that cross it are dropped
+SEP = "\x00"
+
+# id spaces up to this size are counted with a dense bincount
+DENSE_LIMIT = 1 << 24
+
+
+def pad_name(name, n):
+    return BOS * (n - 1) + name + EOS
+
+
+def join_names(names, n=2, pad=False):
+    """Lower-cased names joined into one SEP-separated string."""
+    names = list(names)
+    if pad and names:
+        start = BOS * (n - 1)
+        text = start + (EOS + SEP + start).join(names) + EOS
+    else:
+        text = SEP.join(names)
+    return text.lower()
+
+
+def code_points(text):
+    return np.frombuffer(text.encode("utf-32-le"), dtype="<u4")
+
+
+class Alphabet:
+    """Sorted character set mapping characters to dense integer codes."""
+
+    def __init__(self, chars):
+        self.chars = "".join(sorted(set(chars)))
+        self.points = code_points(self.chars).astype(np.int64)
+        self.size = len(self.chars)
+        top = int(self.points[-1]) + 1 if self.size else 1
+        self._lut = np.full(top, -1, dtype=np.int64)
+        self._lut[self.points] = np.arange(self.size)
+
+    @classmethod
+    def from_points(cls, points):
+        return cls("".join(map(chr, points)))
+
+    def __len__(self):
+        return self.size
+
+    def __contains__(self, char):
+        return char in self.chars
+
+    def index(self, char):
+        return self.chars.find(char)
+
+    def encode_points(self, points):
+        """Map code points to codes; characters outside the set get -1."""
+        points = np.asarray(points)
+        if not len(points) or points.max() < len(self._lut):
+            return self._lut[points]
+        codes = np.full(points.shape, -1, dtype=np.int64)
+        known = points < len(self._lut)
+        codes[known] = self._lut[points[known]]
+        return codes
+
+    def encode(self, text):
+        return self.encode_points(code_points(text))
+
+    def decode(self, codes):
+        """Turn a (m, n) code matrix into a list of m strings."""
+        codes = np.atleast_2d(np.asarray(codes))
+        rows = np.ascontiguousarray(
+            self.points[codes].astype("<u4")
+        )
+        return rows.view(f"<U{codes.shape[1]}").ravel().tolist()
+
+
+def encode_corpus(names, n=2, pad=False, alphabet=None):
+    """Encode names into one code array plus the alphabet used.
+
+    When no alphabet is given one is built from the corpus itself,
+    and always contains SEP.
+    """
+    points = code_points(join_names(names, n, pad))
+    if alphabet is None:
+        if len(points):
+            seen = np.bincount(points) > 0
+            seen[ord(SEP)] = True
+            alphabet = Alphabet.from_points(np.flatnonzero(seen))
+        else:
+            alphabet = Alphabet(SEP)
+    return alphabet.encode_points(points), alphabet
+
+
+def encode_batch(names, alphabet, n=2, pad=False, fill=-1):
+    """Encode names into an (m, L) code matrix plus their lengths.
+
+    Row i holds the codes of names[i] followed by `fill` up to the
+    longest name in the batch; characters outside the alphabet get -1.
+    """
+    names = list(names)
+    if not names:
+        return np.full((0, 0), fill, dtype=np.int64), np.zeros(0, int)
+    points = code_points(join_names(names, n, pad))
+    is_sep = points == ord(SEP)
+    ends = np.append(np.flatnonzero(is_sep), len(points))
+    starts = np.append(0, ends[:-1] + 1)
+    lengths = ends - starts
+    codes = np.full((len(names), lengths.max()), fill, dtype=np.int64)
+    rows = np.repeat(np.arange(len(names)), lengths)
+    cols = np.arange(len(rows)) - np.repeat(
+        np.cumsum(lengths) - lengths, lengths
+    )
+    codes[rows, cols] = alphabet.encode_points(points[~is_sep])
+    return codes, lengths
+
+
+def window_ids(codes, base, n):
+    """Pack every length-n window of codes into one base-`base` id."""
+    m = len(codes) - n + 1
+    if m <= 0:
+        return np.zeros(0, dtype=np.int64)
+    ids = codes[:m].astype(np.int64)
+    for j in range(1, n):
+        ids = ids * base + codes[j:j + m]
+    return ids
+
+
+def valid_windows(stop, n):
+    """Mask of length-n windows that contain no `stop` position."""
+    m = len(stop) - n + 1
+    if m <= 0:
+        return np.zeros(0, dtype=bool)
+    hit = stop[:m].copy()
+    for j in range(1, n):
+        hit |= stop[j:j + m]
+    return ~hit
+
+
+@instrument.timed("ngram_ids")
+def ngram_ids(names, n=2, pad=False, alphabet=None):
+    """Packed ids of every n-gram in names, in corpus order."""
+    codes, alphabet = encode_corpus(names, n, pad, alphabet)
+    base = max(alphabet.size, 1)
+    if base ** n >= 2 ** 63:
+        raise ValueError(
+            f"alphabet of {alphabet.size} characters is too large "
+            f"to pack {n}-grams into 64-bit ids"
+        )
+    # unknown characters (-1) break windows just like separators
+    stop = (codes < 0) | (codes == alphabet.index(SEP))
+    keep = valid_windows(stop, n)
+    ids = window_ids(codes, base, n)[keep]
+    instrument.count("ngrams_emitted", len(ids))
+    return ids, alphabet
+
+
+def unpack_ids(ids, base, n):
+    """Inverse of window_ids: a (len(ids), n) code matrix."""
+    ids = np.asarray(ids, dtype=np.int64)
+    out = np.empty((len(ids), n), dtype=np.int64)
+    for j in range(n - 1, -1, -1):
+        out[:, j] = ids % base
+        ids = ids // base
+    return out
+
+
+def count_ids(ids, space=None):
+    """Unique ids and their counts.
+
+    Dense id spaces keep first-occurrence order, so ties break the same
+    way a Counter fed in corpus order would; sparse spaces come back
+    sorted by id.
+    """
+    if space is not None and space <= DENSE_LIMIT:
+        counts = np.bincount(ids, minlength=space)
+        uniq = np.flatnonzero(counts)
+        first = np.full(space, len(ids), dtype=np.int64)
+        np.minimum.at(first, ids, np.arange(len(ids)))
+        uniq = uniq[np.argsort(first[uniq], kind="stable")]
+        return uniq, counts[uniq]
+    return np.unique(ids, return_counts=True)
+
+
+def count_ngrams(names, n=2, pad=False):
+    """Vectorized equivalent of counting extract_ngrams over names."""
+    if not 1 <= n <= 5:
+        raise ValueError(f"n must be between 1 and 5, got {n}")
+    ids, alphabet = ngram_ids(names, n, pad)
+    base = max(alphabet.size, 1)
+    uniq, counts = count_ids(ids, base ** n)
+    grams = alphabet.decode(unpack_ids(uniq, base, n))
+    return Counter(dict(zip(grams, counts.tolist())))
@@ -0,0 +1,191 @@
+import os
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from .bigram_lm import CHUNK_SIZE, masked_sums
+from .ngrams import Alphabet, count_ngrams, encode_batch
+from .utils import DATA_DIR, LANGUAGES, parse_line
+
+
+def default_workers():
+    return os.cpu_count() or 1
+
+
+def shards(items, parts):
+    """Split a sequence into `parts` contiguous, near-equal slices."""
+    bounds = np.linspace(0, len(items), parts + 1).astype(int)
+    return [items[a:b] for a, b in zip(bounds[:-1], bounds[1:]) if b > a]
+
+
+def merge_counts(partials):
+    """Reduce step: add partial count tables in shard order."""
+    total = Counter()
+    for counts in partials:
+        total.update(counts)
+    return total
+
+
+def _count_shard(args):
+    names, n, pad = args
+    return count_ngrams(names, n, pad)
+
+
+def parallel_frequencies(names, n=2, pad=False, workers=None):
+    """compute_frequencies with the corpus sharded across processes.
+
+    Partial Counters are merged in shard order, so the result (tie
+    order included) is the same as a single-process count.
+    """
+    workers = workers or default_workers()
+    names = list(names)
+    jobs = [(part, n, pad) for part in shards(names, workers)]
+    with ProcessPoolExecutor(workers) as pool:
+        return merge_counts(pool.map(_count_shard, jobs))
+
+
+def _count_file_range(args):
+    filepath, start, end, n, pad, lang = args
+    names = []
+    with open(filepath, "rb") as f:
+        if start:
+            # a line straddling start belongs to the previous range
+            f.seek(start - 1)
+            f.readline()
+        while f.tell() < end:
+            line = f.readline()
+            if not line:
+                break
+            entry = parse_line(line.decode("utf-8"),
+                               None if lang is not None else LANGUAGES)
+            if entry is not None and (lang is None or entry[1] == lang):
+                names.append(entry[0])
+    return count_ngrams(names, n, pad)
+
+
+def parallel_file_frequencies(filepath=None, n=2, pad=False, lang=None,
+                              workers=None):
+    """Count n-grams of a data file with each worker reading a byte range.
+
+    Nothing but the file path and offsets is sent to the workers, so the
+    corpus is never pickled between processes.
+    """
+    if filepath is None:
+        filepath = os.path.join(DATA_DIR, "Russian-and-English-dev.txt")
+    workers = workers or default_workers()
+    size = os.path.getsize(filepath)
+    bounds = np.linspace(0, size, workers + 1).astype(int)
+    jobs = [(filepath, a, b, n, pad, lang)
+            for a, b in zip(bounds[:-1], bounds[1:]) if b > a]
+    with ProcessPoolExecutor(len(jobs) or 1) as pool:
+        return merge_counts(pool.map(_count_file_range, jobs))
+
+
+# per-worker view of the shared model tables
+_shared = {}
+
+
+def _attach_tables(shm_name, shape, dtype, chars, pad):
+    shm = shared_memory.SharedMemory(name=shm_name)
+    _shared["shm"] = shm
+    _shared["tables"] = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+    _shared["alphabet"] = Alphabet(chars)
+    _shared["pad"] = pad
+
+
+def _score_chunk(names):
+    alphabet = _shared["alphabet"]
+    codes, lengths = encode_batch(names, alphabet, 2, _shared["pad"])
+    codes = np.where(codes < 0, alphabet.size, codes)
+    return masked_sums(_shared["tables"], codes, lengths)
+
+
+def parallel_score_batch(lms, names, workers=None, chunk_size=CHUNK_SIZE):
+    """bigram_lm.score_batch fanned out over a process pool.
+
+    The stacked log-prob tables are copied once into shared memory and
+    every worker maps them instead of receiving its own copy. All LMs
+    must share an alphabet and padding mode.
+    """
+    first = lms[0]
+    if any(lm.alphabet.chars != first.alphabet.chars
+           or lm.pad != first.pad for lm in lms):
+        raise ValueError("LMs scored together must share an alphabet")
+    workers = workers or default_workers()
+    names = list(names)
+    tables = np.stack([np.asarray(lm.log_probs) for lm in lms])
+    shm = shared_memory.SharedMemory(create=True, size=tables.nbytes)
+    try:
+        view = np.ndarray(tables.shape, dtype=tables.dtype, buffer=shm.buf)
+        view[:] = tables
+        init = (shm.name, tables.shape, tables.dtype.str,
+                first.alphabet.chars, first.pad)
+        chunk_size = max(1, min(chunk_size, -(-len(names) // workers)))
+        chunks = [names[i:i + chunk_size]
+                  for i in range(0, len(names), chunk_size)]
+        with ProcessPoolExecutor(workers, initializer=_attach_tables,
+                                 initargs=init) as pool:
+            parts = list(pool.map(_score_chunk, chunks))
+        del view
+    finally:
+        shm.close()
+        shm.unlink()
+    if not parts:
+        return np.zeros((len(lms), 0))
+    return np.concatenate(parts, axis=1)
+
+
+def _transform_chunk(args):
+    vectorizer, names = args
+    return vectorizer.transform(names)
+
+
+def parallel_transform(vectorizer, names, workers=None,
+                       chunk_size=CHUNK_SIZE):
+    """Featurize names in parallel chunks and stack the CSR blocks."""
+    from scipy.sparse import vstack
+
+    workers = workers or default_workers()
+    names = list(names)
+    chunk_size = max(1, min(chunk_size, -(-len(names) // workers)))
+    jobs = [(vectorizer, names[i:i + chunk_size])
+            for i in range(0, len(names), chunk_size)]
+    if not jobs:
+        return vectorizer.transform([])
+    with ProcessPoolExecutor(workers) as pool:
+        return vstack(list(pool.map(_transform_chunk, jobs)), format="csr")
+
+
+_predictor = {}
+
+
+def _load_predictor(vectorizer, model):
+    _predictor["vectorizer"] = vectorizer
+    _predictor["model"] = model
+
+
+def _predict_chunk(names):
+    X = _predictor["vectorizer"].transform(names)
+    return _predictor["model"].predict(X)
+
+
+def parallel_predict(vectorizer, model, names, workers=None,
+                     chunk_size=CHUNK_SIZE):
+    """vectorizer.transform + model.predict over a process pool.
+
+    The fitted pair is sent to each worker once at start-up rather
+    than with every chunk.
+    """
+    workers = workers or default_workers()
+    names = list(names)
+    chunk_size = max(1, min(chunk_size, -(-len(names) // workers)))
+    chunks = [names[i:i + chunk_size]
+              for i in range(0, len(names), chunk_size)]
+    with ProcessPoolExecutor(workers, initializer=_load_predictor,
+                             initargs=(vectorizer, model)) as pool:
+        parts = list(pool.map(_predict_chunk, chunks))
+    if not parts:
+        return np.array([], dtype=object)
+    return np.concatenate(parts)
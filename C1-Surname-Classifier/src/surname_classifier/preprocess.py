@@ -0,0 +1,254 @@
+import hashlib
+import math
+import os
+import unicodedata
+
+import numpy as np
+
+from . import instrument
+from .artifact import load_artifact, save_artifact
+from .ngrams import SEP, code_points
+from .utils import DATA_DIR, LANGUAGES, iter_batches
+
+
+CACHE_DIR = os.path.join(os.path.dirname(DATA_DIR), "cache")
+
+# bump when normalization or deduplication changes what a cached
+# corpus holds, so stale caches are rebuilt rather than reused
+PIPELINE_VERSION = 3
+
+# letters NFKD does not decompose into a base letter plus marks
+FOLD = {
+    "ß": "ss", "æ": "ae", "Æ": "Ae", "œ": "oe", "Œ": "Oe", "ø": "o",
+    "Ø": "O", "ł": "l", "Ł": "L", "đ": "d", "Đ": "D", "þ": "th",
+    "Þ": "Th", "ð": "d", "Ð": "D", "ı": "i",
+}
+# Russian Cyrillic, BGN/PCGN-style without diacritics
+CYRILLIC = {
+    "а": "a", "б": "b", "в": "v", "г": "g", "д": "d", "е": "e",
+    "ё": "e", "ж": "zh", "з": "z", "и": "i", "й": "y", "к": "k",
+    "л": "l", "м": "m", "н": "n", "о": "o", "п": "p", "р": "r",
+    "с": "s", "т": "t", "у": "u", "ф": "f", "х": "kh", "ц": "ts",
+    "ч": "ch", "ш": "sh", "щ": "shch", "ъ": "", "ы": "y", "ь": "",
+    "э": "e", "ю": "yu", "я": "ya",
+}
+TRANSLITERATION = str.maketrans({
+    **FOLD, **CYRILLIC,
+    **{k.upper(): v.capitalize() for k, v in CYRILLIC.items()},
+})
+
+
+def normalize_name(name):
+    """Name in plain Latin letters, with whitespace collapsed.
+
+    Cyrillic is transliterated and the few letters with no
+    decomposition are folded (ß -> ss) on the composed (NFC) name, so
+    letters such as й keep their own spelling; NFKD then splits the
+    remaining accented letters into base letter plus combining marks,
+    which are dropped (é -> e). ASCII names, nearly all of them, are
+    returned as they are.
+    """
+    name = " ".join(name.split())
+    if name.isascii():
+        return name
+    name = unicodedata.normalize("NFC", name).translate(TRANSLITERATION)
+    name = unicodedata.normalize("NFKD", name)
+    return "".join(c for c in name if not unicodedata.combining(c))
+
+
+def name_key(name):
+    """Key under which two spellings count as the same name."""
+    return normalize_name(name).casefold()
+
+
+class SeenSet:
+    """Exact membership for deduplication: a set of the keys."""
+
+    def __init__(self):
+        self.keys = set()
+
+    def seen(self, keys):
+        """Mark which keys were added before; then add them all."""
+        out = np.zeros(len(keys), dtype=bool)
+        for i, key in enumerate(keys):
+            out[i] = key in self.keys
+            self.keys.add(key)
+        return out
+
+
+class BloomFilter:
+    """Approximate membership in a fixed bit array, for inputs whose
+    keys do not fit in memory.
+
+    Sized for capacity keys at the given false-positive rate; a false
+    positive drops a name that was not really a duplicate, so the
+    cleaned corpus may lose about error_rate of its unique names.
+    """
+
+    def __init__(self, capacity, error_rate=1e-3):
+        capacity = max(int(capacity), 1)
+        self.size = math.ceil(-capacity * math.log(error_rate)
+                              / math.log(2) ** 2)
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = np.zeros(-(-self.size // 8), dtype=np.uint8)
+
+    def _positions(self, keys):
+        digests = b"".join(
+            hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+            for key in keys
+        )
+        h = np.frombuffer(digests, dtype="<u8").reshape(-1, 2)
+        # double hashing: position i is h1 + i * h2 (mod size)
+        steps = np.arange(self.hashes, dtype=np.uint64)
+        with np.errstate(over="ignore"):
+            return (h[:, :1] + steps * h[:, 1:]) % np.uint64(self.size)
+
+    def seen(self, keys):
+        """Mark which keys were (probably) added before; then add them."""
+        if not len(keys):
+            return np.zeros(0, dtype=bool)
+        pos = self._positions(keys)
+        hit = (self.bits[pos // 8] >> (pos % 8).astype(np.uint8)) & 1
+        out = hit.all(axis=1)
+        # repeats inside this batch are duplicates of their first copy
+        _, first = np.unique(pos, axis=0, return_index=True)
+        repeat = np.ones(len(keys), dtype=bool)
+        repeat[first] = False
+        out |= repeat
+        np.bitwise_or.at(self.bits, pos // 8,
+                         np.left_shift(1, pos % 8).astype(np.uint8))
+        return out
+
+
+def clean_batches(batches, seen=None):
+    """Normalize and deduplicate (names, labels) batches.
+
+    Yields (names, labels, stats) per batch, where stats counts the
+    names that were normalized and the duplicates that were dropped.
+    A name is a duplicate when its key and label were seen before, so
+    the same name under two labels is kept twice.
+    """
+    seen = seen if seen is not None else SeenSet()
+    for names, labels in batches:
+        clean = [normalize_name(name) for name in names]
+        keys = [f"{label}{SEP}{name.casefold()}"
+                for name, label in zip(clean, labels)]
+        keep = ~seen.seen(keys)
+        stats = {
+            "normalized": sum(a != b for a, b in zip(names, clean)),
+            "duplicates": int(len(keys) - keep.sum()),
+        }
+        yield ([n for n, k in zip(clean, keep) if k],
+               [l for l, k in zip(labels, keep) if k], stats)
+
+
+def find_leakage(train_names, test_names):
+    """Sorted name keys that occur in both train and test names."""
+    return sorted({name_key(n) for n in train_names}
+                  & {name_key(n) for n in test_names})
+
+
+def file_hash(filepath, block_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(filepath, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class Corpus:
+    """A cleaned data file: names, labels and cleaning stats."""
+
+    def __init__(self, names, labels, stats):
+        self.names = names
+        self.labels = labels
+        self.stats = stats
+
+    @classmethod
+    def from_file(cls, filepath=None, languages=LANGUAGES, bloom=None):
+        """Read, normalize and deduplicate a data file in batches.
+
+        Names with spaces ("van der Berg"), which load_data skips as
+        noise, are kept and normalized here. bloom, an expected number
+        of names, swaps the exact SeenSet for a BloomFilter of that
+        capacity.
+        """
+        seen = BloomFilter(bloom) if bloom else SeenSet()
+        names, labels = [], []
+        stats = {"normalized": 0, "duplicates": 0}
+        for batch_names, batch_labels, batch_stats in clean_batches(
+            iter_batches(filepath, languages=languages, keep_spaces=True),
+            seen
+        ):
+            names.extend(batch_names)
+            labels.extend(batch_labels)
+            for key, value in batch_stats.items():
+                stats[key] += value
+        stats["kept"] = len(names)
+        return cls(names, labels, stats)
+
+    def save(self, path, source_hash=""):
+        label_set = sorted(set(self.labels))
+        label_index = {label: i for i, label in enumerate(label_set)}
+        meta = {
+            "labels": label_set, "stats": self.stats,
+            "source_sha256": source_hash,
+            "pipeline_version": PIPELINE_VERSION,
+        }
+        save_artifact(path, "corpus", meta, {
+            "points": code_points(SEP.join(self.names)),
+            "label_ids": np.array([label_index[l] for l in self.labels],
+                                  dtype=np.int32),
+        })
+
+    @classmethod
+    def load(cls, path, mmap=True, verify=True):
+        meta, arrays = load_artifact(path, "corpus", mmap, verify)
+        points = np.asarray(arrays["points"], dtype="<u4")
+        text = points.tobytes().decode("utf-32-le")
+        names = text.split(SEP) if text else []
+        label_set = meta["labels"]
+        labels = [label_set[i] for i in arrays["label_ids"].tolist()]
+        return cls(names, labels, meta["stats"])
+
+
+def cache_path(source_hash, languages=LANGUAGES, cache_dir=CACHE_DIR,
+               bloom=None):
+    """Cache file for a data file's hash and the cleaning options.
+
+    bloom is part of the key: a Bloom-filter corpus may have lost names
+    to false positives, so it never stands in for an exact one.
+    """
+    options = (f"{PIPELINE_VERSION}:{sorted(languages or ['*'])}:"
+               f"bloom={bloom or 0}")
+    key = hashlib.sha256((source_hash + options).encode("utf-8"))
+    return os.path.join(cache_dir, key.hexdigest()[:32] + ".corpus")
+
+
+def load_corpus(filepath=None, languages=LANGUAGES, cache_dir=CACHE_DIR,
+                bloom=None):
+    """The cleaned corpus of a data file, cached on disk.
+
+    The cache is keyed by the file's sha256, so an unchanged file is
+    loaded straight from its memory-mapped cache and an edited one is
+    cleaned again; a corrupt cache is rebuilt. cache_dir=None skips
+    the cache.
+    """
+    if filepath is None:
+        filepath = os.path.join(DATA_DIR, "Russian-and-English-dev.txt")
+    if cache_dir is None:
+        return Corpus.from_file(filepath, languages, bloom)
+    source_hash = file_hash(filepath)
+    path = cache_path(source_hash, languages, cache_dir, bloom)
+    if os.path.exists(path):
+        try:
+            corpus = Corpus.load(path)
+            instrument.count("corpus_cache_hits")
+            return corpus
+        except ValueError:
+            pass
+    instrument.count("corpus_cache_misses")
+    corpus = Corpus.from_file(filepath, languages, bloom)
+    os.makedirs(cache_dir, exist_ok=True)
+    corpus.save(path, source_hash)
+    return corpus
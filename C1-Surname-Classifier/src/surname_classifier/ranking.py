@@ -0,0 +1,126 @@
+import numpy as np
+
+from .ngrams import Alphabet, SEP, ngram_ids, unpack_ids
+
+
+METRICS = ("abs_diff", "log_odds", "mutual_information", "chi_squared")
+
+
+def count_matrix(name_groups, n=2, pad=False):
+    """(grams, counts) for several corpora over one shared vocabulary.
+
+    counts[l, j] is how often grams[j] occurs in name_groups[l]; grams
+    are sorted. Everything is counted as packed ids, so no per-gram
+    Python objects exist until the vocabulary is decoded.
+    """
+    name_groups = [list(names) for names in name_groups]
+    chars = set(SEP)
+    for names in name_groups:
+        chars.update("".join(names).lower())
+    if pad:
+        chars.update("^$")
+    alphabet = Alphabet("".join(chars))
+    base = alphabet.size
+    ids = [ngram_ids(names, n, pad, alphabet)[0] for names in name_groups]
+    vocab, column = np.unique(np.concatenate(ids), return_inverse=True)
+    group = np.repeat(np.arange(len(ids)), [len(i) for i in ids])
+    counts = np.bincount(group * len(vocab) + column,
+                         minlength=len(ids) * len(vocab))
+    grams = np.array(alphabet.decode(unpack_ids(vocab, base, n)))
+    return grams, counts.reshape(len(ids), len(vocab))
+
+
+def align_counts(counters):
+    """(grams, counts) for several n-gram Counters (any order, any key)."""
+    keys = [np.array(list(c), dtype=str) for c in counters]
+    grams, column = np.unique(np.concatenate(keys), return_inverse=True)
+    counts = np.zeros((len(counters), len(grams)), dtype=np.int64)
+    start = 0
+    for row, counter in enumerate(counters):
+        stop = start + len(keys[row])
+        counts[row, column[start:stop]] = np.fromiter(
+            counter.values(), dtype=np.int64, count=len(keys[row])
+        )
+        start = stop
+    return grams, counts
+
+
+def _log_ratio(num, den):
+    """num * log(num / den) with 0 log 0 = 0."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out = num * np.log(num / den)
+    return np.where(num > 0, out, 0.0)
+
+
+def score_ngrams(counts, metrics=METRICS, prior_size=None):
+    """Discriminative metrics for an (L, G) count matrix in one pass.
+
+    Returns a dict with "freqs", the (L, G) relative frequency within
+    each language, plus whichever of these metrics were asked for:
+      abs_diff            (G,) max - min of freqs, |p_1 - p_2| for two
+      log_odds            (L, G) z-scored log-odds of each language vs
+                          the rest, informative Dirichlet prior
+                          (Monroe et al. 2008) proportional to the
+                          pooled counts, with prior_size pseudo-counts
+                          in total (default: as many as the corpus)
+      mutual_information  (G,) I(gram occurs; language), in bits
+      chi_squared         (G,) Pearson chi-squared of the gram vs
+                          language 2 x L contingency table
+    """
+    unknown = set(metrics) - set(METRICS)
+    if unknown:
+        raise ValueError(f"unknown metrics: {sorted(unknown)}")
+    counts = np.asarray(counts, dtype=np.float64)
+    totals = counts.sum(axis=1, keepdims=True)
+    pooled = counts.sum(axis=0)
+    total = totals.sum()
+    freqs = counts / totals
+    out = {"freqs": freqs}
+
+    if "abs_diff" in metrics:
+        out["abs_diff"] = freqs.max(axis=0) - freqs.min(axis=0)
+    if "log_odds" in metrics:
+        alpha_size = total if prior_size is None else prior_size
+        alpha = alpha_size * pooled / total
+        rest, rest_totals = pooled - counts, total - totals
+        with np.errstate(divide="ignore", invalid="ignore"):
+            delta = (
+                np.log((counts + alpha)
+                       / (totals + alpha_size - counts - alpha))
+                - np.log((rest + alpha)
+                         / (rest_totals + alpha_size - rest - alpha))
+            )
+            z = delta / np.sqrt(1 / (counts + alpha) + 1 / (rest + alpha))
+        # a gram no language uses (possible with align_counts over
+        # Counters holding zeros) has no prior and carries no evidence
+        out["log_odds"] = np.where(pooled > 0, z, 0.0)
+
+    # 2 x L table per gram: occurrences of the gram vs everything else
+    lang = totals / total
+    if "mutual_information" in metrics:
+        hit, miss = counts / total, (totals - counts) / total
+        p_hit = pooled / total
+        out["mutual_information"] = (
+            _log_ratio(hit, p_hit * lang)
+            + _log_ratio(miss, (1 - p_hit) * lang)
+        ).sum(axis=0) / np.log(2)
+    if "chi_squared" in metrics:
+        expected_hit = pooled * lang
+        expected_miss = (total - pooled) * lang
+        with np.errstate(divide="ignore", invalid="ignore"):
+            chi = ((counts - expected_hit) ** 2 / expected_hit
+                   + np.where(expected_miss > 0,
+                              (totals - counts - expected_miss) ** 2
+                              / expected_miss, 0.0))
+        out["chi_squared"] = chi.sum(axis=0)
+    return out
+
+
+def rank(scores, descending=False):
+    """Order of n-grams by score.
+
+    count_matrix and align_counts return grams sorted, so the stable
+    sort breaks ties by gram and the ranking is the same on every run.
+    """
+    scores = np.asarray(scores)
+    return np.argsort(-scores if descending else scores, kind="stable")
@@ -0,0 +1,249 @@
+"""Long-running scoring service over preloaded bigram LMs.
+
+    python -m surname_classifier.server --train models/   # fit, save once
+    python -m surname_classifier.server --models models/ --port 8321
+
+    GET  /classify?name=Ivanov
+    POST /classify   {"names": ["Ivanov", "Smith"]}
+    POST /score      {"names": [...]}    -> log P under each language LM
+    GET  /complete?prefix=Ber&k=5
+
+Concurrent requests are micro-batched: everything queued by the time
+the scorer runs (plus anything arriving within --max-wait-ms) is scored
+in one vectorized call.
+"""
+import argparse
+import asyncio
+import json
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+
+from .bigram_lm import score_batch
+from .completion import Completer
+from .models import load_models, save_models, saved_languages
+
+
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found"}
+
+
+def positive_int(value):
+    """value as an int >= 1 (ints or digit strings), else None."""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, str):
+        value = value.strip()
+        if not value.isdigit():
+            return None
+        value = int(value)
+    if not isinstance(value, int) or value < 1:
+        return None
+    return value
+
+
+class Batcher:
+    """Collects names from concurrent requests into one scoring call."""
+
+    def __init__(self, lms, max_batch=4096, max_wait=0.0):
+        self.lms = lms
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.queue = asyncio.Queue()
+        self.task = None
+
+    def start(self):
+        self.task = asyncio.get_running_loop().create_task(self._run())
+
+    async def score(self, names):
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((names, future))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            pending = [await self.queue.get()]
+            size = len(pending[0][0])
+            deadline = loop.time() + self.max_wait
+            # let every connection with a ready request enqueue it, then
+            # keep collecting until the batch is full or the wait is over
+            await asyncio.sleep(0)
+            while size < self.max_batch:
+                if self.queue.empty():
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(
+                            self.queue.get(), timeout
+                        )
+                    except asyncio.TimeoutError:
+                        break
+                else:
+                    item = self.queue.get_nowait()
+                pending.append(item)
+                size += len(item[0])
+            # a client that disconnected or was cancelled meanwhile
+            # leaves a done future behind; skip it rather than let
+            # InvalidStateError end the loop for every later request
+            pending = [(batch, future) for batch, future in pending
+                       if not future.done()]
+            names = [n for batch, _ in pending for n in batch]
+            try:
+                scores = score_batch(self.lms, names)
+            except Exception as exc:
+                for _, future in pending:
+                    if not future.done():
+                        future.set_exception(exc)
+                continue
+            start = 0
+            for batch, future in pending:
+                if not future.done():
+                    future.set_result(scores[:, start:start + len(batch)])
+                start += len(batch)
+
+
+class ScoringService:
+    """Classifies among languages, the keys of models other than
+    "complete" (the completion LM) and "logistic"."""
+
+    def __init__(self, models, max_batch=4096, max_wait=0.0):
+        self.languages = [key for key in models
+                          if key not in ("complete", "logistic")]
+        self.batcher = Batcher(
+            [models[lang] for lang in self.languages], max_batch, max_wait
+        )
+        self.completer = Completer(models["complete"])
+
+    async def classify(self, names):
+        scores = await self.batcher.score(names)
+        labels = np.asarray(self.languages)[scores.argmax(axis=0)]
+        return {"labels": labels.tolist()}
+
+    async def score(self, names):
+        scores = await self.batcher.score(names)
+        return {lang: row.tolist()
+                for lang, row in zip(self.languages, scores)}
+
+    async def complete(self, prefix, k=5):
+        return {"completions": [
+            {"name": name, "log_prob": log_prob}
+            for name, log_prob in self.completer.complete(prefix, k)
+        ]}
+
+    async def handle(self, method, path, query, body):
+        """(status, payload) for one request."""
+        params = {key: values[-1] for key, values in parse_qs(query).items()}
+        data = json.loads(body) if body else {}
+        if not isinstance(data, dict):
+            return 400, {"error": "expected a JSON object"}
+        if path in ("/classify", "/score"):
+            names = data.get("names")
+            if names is None and "name" in params:
+                names = [params["name"]]
+            if not isinstance(names, list):
+                return 400, {"error": "expected names"}
+            handler = self.classify if path == "/classify" else self.score
+            return 200, await handler([str(n) for n in names])
+        if path == "/complete":
+            prefix = data.get("prefix", params.get("prefix"))
+            if not prefix or not isinstance(prefix, str):
+                return 400, {"error": "expected prefix"}
+            k = positive_int(data.get("k", params.get("k", 5)))
+            if k is None:
+                return 400, {"error": "k must be an integer >= 1"}
+            return 200, await self.complete(prefix, k)
+        if path == "/health":
+            return 200, {"status": "ok"}
+        return 404, {"error": f"unknown endpoint {path}"}
+
+    async def respond(self, writer, status, payload):
+        out = json.dumps(payload).encode()
+        writer.write(
+            f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(out)}\r\n\r\n".encode() + out
+        )
+        await writer.drain()
+
+    async def serve_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                parts = request_line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    key, _, value = line.decode("latin-1").partition(":")
+                    headers[key.strip().lower()] = value.strip()
+                length = headers.get("content-length", "0")
+                if len(parts) != 3 or not length.isdigit():
+                    # the request cannot be framed, so the connection
+                    # cannot be reused either
+                    await self.respond(writer, 400,
+                                       {"error": "malformed request"})
+                    break
+                method, target, _ = parts
+                length = int(length)
+                body = await reader.readexactly(length) if length else b""
+                url = urlsplit(target)
+                try:
+                    status, payload = await self.handle(
+                        method, url.path, url.query, body
+                    )
+                except (ValueError, KeyError, TypeError) as exc:
+                    status, payload = 400, {"error": str(exc)}
+                await self.respond(writer, status, payload)
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+
+async def start_server(models, host="127.0.0.1", port=8321, **batching):
+    """Start serving; returns the asyncio server (port 0 picks a free one)."""
+    service = ScoringService(models, **batching)
+    service.batcher.start()
+    return await asyncio.start_server(service.serve_connection, host, port)
+
+
+async def serve(models, host, port, **batching):
+    server = await start_server(models, host, port, **batching)
+    addr = server.sockets[0].getsockname()
+    print(f"Serving on http://{addr[0]}:{addr[1]}", flush=True)
+    async with server:
+        await server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--models", default="models",
+                        help="directory with the saved LMs")
+    parser.add_argument("--train", metavar="DIR",
+                        help="train and save models to DIR, then exit")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8321)
+    parser.add_argument("--max-batch", type=int, default=4096)
+    parser.add_argument("--max-wait-ms", type=float, default=0.0,
+                        help="extra time to wait for a fuller batch")
+    args = parser.parse_args(argv)
+
+    if args.train:
+        save_models(args.train)
+        print(f"Models saved to {args.train}/")
+        return
+    models = load_models(args.models,
+                         saved_languages(args.models) + ["complete"])
+    asyncio.run(serve(models, args.host, args.port,
+                      max_batch=args.max_batch,
+                      max_wait=args.max_wait_ms / 1000))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,303 @@
+"""Fixed-memory approximate n-gram counts.
+
+A Count-Min sketch answers "how often did this n-gram occur" for any
+n-gram in depth x width counters, never underestimating and
+overestimating by at most epsilon * total with probability 1 - delta.
+A heavy-hitter table next to it remembers which n-grams are frequent,
+which the sketch alone cannot enumerate. Both are sized up front and
+do not grow with the corpus.
+"""
+import math
+
+import numpy as np
+
+from .ngrams import encode_corpus, ngram_ids, unpack_ids
+
+
+def _multipliers(depth, seed):
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, 2 ** 63, size=depth, dtype=np.uint64) * 2 + 1
+    b = rng.integers(0, 2 ** 63, size=depth, dtype=np.uint64)
+    return a[:, None], b[:, None]
+
+
+class CountMinSketch:
+    """Count-Min sketch over non-negative integer ids.
+
+    Each row hashes an id to one of width counters with multiply-shift
+    hashing, so width is rounded up to a power of two. Updates are
+    conservative: an id only raises its counters up to its new
+    estimate, which keeps the estimate an upper bound while adding far
+    less collision noise than incrementing every row.
+    """
+
+    def __init__(self, width, depth=4, seed=0, dtype=np.uint32):
+        self.bits = max(1, math.ceil(math.log2(max(width, 2))))
+        self.width = 1 << self.bits
+        self.depth = depth
+        self.table = np.zeros((depth, self.width), dtype=dtype)
+        self.total = 0
+        self._a, self._b = _multipliers(depth, seed)
+
+    @classmethod
+    def from_error(cls, epsilon=1e-4, delta=1e-3, **kwargs):
+        """Sketch whose estimates are within epsilon * total of the
+        true count with probability 1 - delta."""
+        return cls(math.ceil(math.e / epsilon),
+                   max(1, math.ceil(math.log(1 / delta))), **kwargs)
+
+    @property
+    def epsilon(self):
+        return math.e / self.width
+
+    @property
+    def delta(self):
+        return math.exp(-self.depth)
+
+    @property
+    def nbytes(self):
+        return self.table.nbytes
+
+    def _cells(self, ids):
+        ids = np.asarray(ids, dtype=np.int64).astype(np.uint64)
+        with np.errstate(over="ignore"):
+            mixed = self._a * ids[None, :] + self._b
+        return (mixed >> np.uint64(64 - self.bits)).astype(np.int64)
+
+    def add(self, ids, counts=None):
+        """Count ids (each once, or counts[i] times)."""
+        ids = np.asarray(ids, dtype=np.int64)
+        if counts is None:
+            ids, counts = np.unique(ids, return_counts=True)
+        else:
+            ids, inverse = np.unique(ids, return_inverse=True)
+            counts = np.bincount(inverse, weights=counts).astype(np.int64)
+        if not len(ids):
+            return
+        cells = self._cells(ids)
+        rows = np.arange(self.depth)[:, None]
+        new = self.table[rows, cells].min(axis=0) + counts
+        top = np.iinfo(self.table.dtype).max
+        new = np.minimum(new, top).astype(self.table.dtype)
+        # a cell shared by several ids of the batch keeps the largest
+        # new estimate, so no id ends up below its own count
+        for row in range(self.depth):
+            np.maximum.at(self.table[row], cells[row], new)
+        self.total += int(counts.sum())
+
+    def estimate(self, ids):
+        """Upper-bound counts of ids (0 only for ids never added)."""
+        cells = self._cells(ids)
+        rows = np.arange(self.depth)[:, None]
+        return self.table[rows, cells].min(axis=0).astype(np.int64)
+
+
+class HeavyHitters:
+    """The capacity ids with the largest sketch estimates seen so far.
+
+    Every batch's ids join the current candidates, all are re-estimated
+    from the sketch and only the top capacity survive, so any id whose
+    count exceeds total / capacity (plus the sketch error) is kept.
+    """
+
+    def __init__(self, sketch, capacity=1024):
+        self.sketch = sketch
+        self.capacity = capacity
+        self.ids = np.zeros(0, dtype=np.int64)
+
+    @property
+    def nbytes(self):
+        return 16 * self.capacity
+
+    def update(self, ids):
+        ids = np.union1d(self.ids, ids)
+        if len(ids) > self.capacity:
+            counts = self.sketch.estimate(ids)
+            keep = np.argpartition(-counts, self.capacity)[:self.capacity]
+            ids = ids[np.sort(keep)]
+        self.ids = ids
+
+    def most_common(self, k=None):
+        """(ids, counts) by decreasing count, ties by id."""
+        counts = self.sketch.estimate(self.ids)
+        order = np.lexsort((self.ids, -counts))[:k]
+        return self.ids[order], counts[order]
+
+
+class SketchCounter:
+    """Approximate compute_frequencies for one n-gram order.
+
+    Lookups of any gram go to the Count-Min sketch; keys, items and
+    most_common cover the heavy hitters, so they are exact
+    compute_frequencies counts (up to the sketch error) as long as
+    capacity is at least the number of distinct n-grams.
+    """
+
+    def __init__(self, alphabet, n=2, pad=False, width=1 << 16, depth=4,
+                 capacity=1024, seed=0):
+        self.alphabet = alphabet
+        self.base = max(alphabet.size, 1)
+        self.n = n
+        self.pad = pad
+        self.sketch = CountMinSketch(width, depth, seed)
+        self.top = HeavyHitters(self.sketch, capacity)
+
+    @classmethod
+    def from_names(cls, names, n=2, pad=False, epsilon=1e-4, delta=1e-3,
+                   capacity=1024):
+        names = list(names)
+        _, alphabet = encode_corpus(names, n, pad)
+        sketch = CountMinSketch.from_error(epsilon, delta)
+        counter = cls(alphabet, n, pad, sketch.width, sketch.depth,
+                      capacity)
+        counter.update(names)
+        return counter
+
+    @property
+    def nbytes(self):
+        return self.sketch.nbytes + self.top.nbytes
+
+    def update(self, names):
+        ids, _ = ngram_ids(names, self.n, self.pad, self.alphabet)
+        self.sketch.add(ids)
+        self.top.update(ids)
+
+    def _ids(self, grams):
+        """Packed ids for grams; -1 where a gram cannot be counted."""
+        grams = list(grams)
+        ids = np.full(len(grams), -1, dtype=np.int64)
+        fits = np.array([len(g) == self.n for g in grams], dtype=bool)
+        if fits.any():
+            text = "".join(g for g, ok in zip(grams, fits) if ok).lower()
+            codes = self.alphabet.encode(text).reshape(-1, self.n)
+            packed = np.zeros(len(codes), dtype=np.int64)
+            for j in range(self.n):
+                packed = packed * self.base + codes[:, j]
+            packed[(codes < 0).any(axis=1)] = -1
+            ids[fits] = packed
+        return ids
+
+    def lookup(self, grams):
+        ids = self._ids(grams)
+        out = np.zeros(len(ids), dtype=np.int64)
+        known = ids >= 0
+        out[known] = self.sketch.estimate(ids[known])
+        return out
+
+    def get(self, gram, default=0):
+        count = int(self.lookup([gram])[0])
+        return count if count else default
+
+    def __getitem__(self, gram):
+        return self.get(gram, 0)
+
+    def __contains__(self, gram):
+        return bool(self.get(gram, 0))
+
+    def __len__(self):
+        return len(self.top.ids)
+
+    def total(self):
+        return self.sketch.total
+
+    def most_common(self, k=None):
+        ids, counts = self.top.most_common(k)
+        grams = self.alphabet.decode(unpack_ids(ids, self.base, self.n))
+        return list(zip(grams, counts.tolist()))
+
+    def items(self):
+        counts = self.sketch.estimate(self.top.ids)
+        grams = self.alphabet.decode(
+            unpack_ids(self.top.ids, self.base, self.n)
+        )
+        return list(zip(grams, counts.tolist()))
+
+    def keys(self):
+        return [gram for gram, _ in self.items()]
+
+    def values(self):
+        return [count for _, count in self.items()]
+
+    def __iter__(self):
+        return iter(self.keys())
+
+
+def compare_counts(approx, exact, k=20):
+    """How close approximate counts (a SketchCounter) are to exact ones.
+
+    {"top_k_recall": share of exact's k most common n-grams that are
+    also among approx's k most common, "max_rel_error" and
+    "mean_rel_error": of approx's counts of exact's top k,
+    "coverage": share of all occurrences whose n-gram approx keeps,
+    "total_error": approx total minus the exact total}.
+    """
+    exact_total = sum(exact.values())
+    top = [gram for gram, _ in exact.most_common(k)]
+    if not top:
+        return {"top_k_recall": 1.0, "max_rel_error": 0.0,
+                "mean_rel_error": 0.0, "coverage": 1.0,
+                "total_error": approx.total() - exact_total}
+    found = {gram for gram, _ in approx.most_common(k)}
+    true = np.array([exact[gram] for gram in top], dtype=float)
+    rel = np.abs(np.array([approx[gram] for gram in top]) - true) / true
+    return {
+        "top_k_recall": len(found.intersection(top)) / len(top),
+        "max_rel_error": float(rel.max()),
+        "mean_rel_error": float(rel.mean()),
+        "coverage": sum(exact[gram] for gram in approx.keys())
+                    / exact_total,
+        "total_error": approx.total() - exact_total,
+    }
+
+
+def sketch_orders(names, order, alphabet, width=1 << 16, depth=4,
+                  capacity=1 << 14, batch_size=10000, seed=0):
+    """Approximate ngram_lm.count_orders in fixed memory.
+
+    Orders whose id space fits in capacity are counted exactly into a
+    dense array; each higher order keeps its capacity heaviest n-grams,
+    counted by its own Count-Min sketch. Names are counted batch by
+    batch. Every suffix of a kept n-gram is kept one order down, so the
+    tables stay closed under backoff as the smoothing methods expect;
+    those suffixes take their table's room first and the order's own
+    heaviest n-grams fill the rest, so no table exceeds capacity.
+    Pass it to NgramLM.from_names as counter (see functools.partial).
+    """
+    from .ngram_lm import count_orders
+
+    base = alphabet.size + 1
+    names = list(names)
+    exact = 0
+    while exact < order and base ** (exact + 1) <= capacity:
+        exact += 1
+    dense = [np.zeros(base ** n, dtype=np.int64) for n in range(1, exact + 1)]
+    heavy = [HeavyHitters(CountMinSketch(width, depth, seed + n), capacity)
+             for n in range(exact + 1, order + 1)]
+    for start in range(0, len(names), batch_size):
+        batch = count_orders(names[start:start + batch_size], order, alphabet)
+        for n, (ids, counts) in enumerate(batch, 1):
+            if n <= exact:
+                dense[n - 1][ids] += counts
+            else:
+                heavy[n - exact - 1].sketch.add(ids, counts)
+                heavy[n - exact - 1].update(ids)
+    tables = [(np.flatnonzero(d), d[np.flatnonzero(d)]) for d in dense]
+    tables += [(h.ids, h.sketch.estimate(h.ids)) for h in heavy]
+    # exact orders already hold every suffix of what they count; a
+    # table above holds at most capacity n-grams, so its suffixes fit
+    for n in range(order, exact + 1, -1):
+        ids, counts = tables[n - 2]
+        suffixes = np.unique(tables[n - 1][0] % base ** (n - 1))
+        own = ~np.isin(ids, suffixes)
+        ids, counts = ids[own], counts[own]
+        room = capacity - len(suffixes)
+        if len(ids) > room:
+            keep = np.sort(np.argpartition(-counts, room)[:room])
+            ids, counts = ids[keep], counts[keep]
+        ids = np.concatenate([ids, suffixes])
+        counts = np.concatenate(
+            [counts, heavy[n - exact - 2].sketch.estimate(suffixes)]
+        )
+        keep = np.argsort(ids)
+        tables[n - 2] = (ids[keep], counts[keep])
+    return tables
@@ -0,0 +1,155 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from sklearn.metrics import f1_score, precision_score, recall_score
+from sklearn.model_selection import StratifiedKFold
+
+from .bigram_lm import masked_sums
+from .classifier import build_vectorizer, train_logistic
+from .ngrams import Alphabet
+from .task4_smoothing import build_lm_from_counts, count_lm
+from .utils import group_by_language, load_data
+
+
+K_GRID = np.round(np.logspace(-3, 1, 50), 6)
+LAMBDA_GRID = [0.5, 0.7, 0.8, 0.9, 0.95, 0.99]
+C_GRID = [0.1, 0.3, 1.0, 3.0, 10.0]
+NGRAM_RANGES = [(2, 2), (2, 3)]
+
+
+def add_k_tables(counts, context_counts, V, ks):
+    """Add-k log-prob tables for every k at once, shape (K, S, S)."""
+    ks = np.asarray(ks, dtype=float)[:, None, None]
+    return np.log((counts + ks) / (context_counts[:, None] + ks * V))
+
+
+def interpolated_tables(counts, context_counts, lambdas):
+    """Jelinek-Mercer tables: lam * P_ML(b|a) + (1 - lam) * P(b).
+
+    The unigram term is add-one smoothed so unseen characters keep a
+    non-zero probability.
+    """
+    size = len(context_counts)
+    unigram = (context_counts + 1) / (context_counts.sum() + size)
+    rows = counts.sum(axis=1, keepdims=True)
+    ml = np.divide(counts, rows, out=np.zeros_like(counts), where=rows > 0)
+    lam = np.asarray(lambdas, dtype=float)[:, None, None]
+    return np.log(lam * ml + (1 - lam) * unigram)
+
+
+def prf(y_true, y_pred):
+    """Precision, recall and F1 of Russian for the English/Russian pair,
+    macro-averaged over the labels for any other label set."""
+    if set(np.unique(y_true)) <= {"English", "Russian"}:
+        average = {"pos_label": "Russian"}
+    else:
+        average = {"average": "macro"}
+    return (
+        precision_score(y_true, y_pred, **average),
+        recall_score(y_true, y_pred, **average),
+        f1_score(y_true, y_pred, **average),
+    )
+
+
+def _lm_fold(args):
+    """Count each language once, then score every smoothing variant."""
+    train_names, train_labels, test_names, test_labels, ks, lambdas = args
+    alphabet = Alphabet("".join(train_names).lower())
+    groups = group_by_language(train_names, train_labels)
+    languages = np.asarray(list(groups))
+    lms = [build_lm_from_counts(*count_lm(names), alphabet=alphabet)
+           for names in groups.values()]
+    codes, lengths = lms[0].encode_batch(test_names)
+
+    rows = []
+    families = [
+        ("add-k", ks, lambda lm: add_k_tables(
+            lm.counts, lm.context_counts, lm.V, ks)),
+        ("interpolated", lambdas, lambda lm: interpolated_tables(
+            lm.counts, lm.context_counts, lambdas)),
+    ]
+    for family, params, tables_for in families:
+        scores = masked_sums(
+            np.concatenate([tables_for(lm) for lm in lms]), codes, lengths
+        )
+        # (languages, params, names) -> best language per param and name
+        scores = scores.reshape(len(lms), len(params), -1)
+        preds = languages[scores.argmax(axis=0)]
+        for param, pred in zip(params, preds):
+            rows.append((family, float(param), *prf(test_labels, pred)))
+    return rows
+
+
+def _logistic_fold(args):
+    """Vectorize once per n-gram range, then fit every C."""
+    train_names, train_labels, test_names, test_labels, cs, ranges = args
+    rows = []
+    for ngram_range in ranges:
+        vectorizer, X_train = build_vectorizer(train_names, ngram_range)
+        X_test = vectorizer.transform(test_names)
+        for C in cs:
+            model = train_logistic(X_train, train_labels, C=C)
+            rows.append((f"logistic{ngram_range}", C,
+                         *prf(test_labels, model.predict(X_test))))
+    return rows
+
+
+def run_sweep(names, labels, n_folds=10, ks=K_GRID, lambdas=LAMBDA_GRID,
+              cs=C_GRID, ngram_ranges=NGRAM_RANGES, workers=None,
+              seed=42):
+    """Stratified k-fold CV over every LM and logistic configuration.
+
+    Returns {(family, param): (precision, recall, f1)} averaged over
+    folds. Each fold is an independent job; with workers > 1 the folds
+    run in a process pool.
+    """
+    names = np.asarray(names, dtype=object)
+    labels = np.asarray(labels)
+    folds = StratifiedKFold(n_folds, shuffle=True, random_state=seed)
+    jobs = []
+    for train_idx, test_idx in folds.split(names, labels):
+        split = (list(names[train_idx]), labels[train_idx],
+                 list(names[test_idx]), labels[test_idx])
+        jobs.append((_lm_fold, split + (ks, lambdas)))
+        jobs.append((_logistic_fold, split + (cs, ngram_ranges)))
+
+    if workers is not None and workers > 1:
+        with ProcessPoolExecutor(workers) as pool:
+            futures = [pool.submit(fn, args) for fn, args in jobs]
+            fold_rows = [f.result() for f in futures]
+    else:
+        fold_rows = [fn(args) for fn, args in jobs]
+
+    scores = {}
+    for rows in fold_rows:
+        for family, param, p, r, f in rows:
+            scores.setdefault((family, param), []).append((p, r, f))
+    return {key: tuple(np.mean(vals, axis=0))
+            for key, vals in scores.items()}
+
+
+def best_per_family(results):
+    best = {}
+    for (family, param), (p, r, f) in results.items():
+        if family not in best or f > best[family][3]:
+            best[family] = (param, p, r, f)
+    return best
+
+
+def main():
+    names, labels = load_data()
+    results = run_sweep(names, labels)
+
+    print("=" * 62)
+    print("10-fold CV Hyperparameter Sweep")
+    print("=" * 62)
+    print(f"{'Model':<22} {'Best param':<12} {'Precision':<10} "
+          f"{'Recall':<10} {'F1':<8}")
+    print("-" * 62)
+    for family, (param, p, r, f) in best_per_family(results).items():
+        print(f"{family:<22} {param:<12g} {p:<10.4f} {r:<10.4f} "
+              f"{f:<8.4f}")
+
+
+if __name__ == "__main__":
+    main()
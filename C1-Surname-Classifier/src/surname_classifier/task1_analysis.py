@@ -0,0 +1,376 @@
+import argparse
+import hashlib
+import json
+import os
+import string
+from collections import Counter
+
+import numpy as np
+
+from . import instrument
+from .ngrams import (
+    SEP, count_ids, encode_corpus, unpack_ids, valid_windows, window_ids,
+)
+from .utils import (
+    load_data, extract_ngrams, compute_frequencies, group_by_language,
+    split_by_language, ensure_results_dir, RESULTS_DIR
+)
+
+
+# bump when a table or plot would be rendered differently from the
+# same counts, so the manifest no longer vouches for old files
+REPORT_VERSION = 1
+MANIFEST_PATH = os.path.join(RESULTS_DIR, ".manifest.json")
+
+
+def count_all_orders(names, labels, orders=(2, 3)):
+    """{language: {n: Counter}} for every order and language at once.
+
+    The names are encoded once; each order is then one vectorized pass
+    over that array, with the language folded into the packed id so a
+    single bincount counts every language. Each Counter equals
+    compute_frequencies over that language's names, in the same
+    first-occurrence order.
+    """
+    languages = list(dict.fromkeys(labels))
+    index = {lang: i for i, lang in enumerate(languages)}
+    codes, alphabet = encode_corpus(names)
+    base = max(alphabet.size, 1)
+    stop = codes == alphabet.index(SEP)
+    # names are SEP-separated, so the SEPs up to a position number it
+    label_ids = np.array([index[lang] for lang in labels], dtype=np.int64)
+    lang_of = label_ids[np.cumsum(stop)]
+    out = {lang: {} for lang in languages}
+    for n in orders:
+        keep = valid_windows(stop, n)
+        space = base ** n
+        ids = window_ids(codes, base, n)[keep]
+        uniq, counts = count_ids(lang_of[:len(keep)][keep] * space + ids,
+                                 space * len(languages))
+        grams = alphabet.decode(unpack_ids(uniq % space, base, n))
+        groups = (uniq // space).tolist()
+        for lang in languages:
+            out[lang][n] = Counter()
+        for gram, group, count in zip(grams, groups, counts.tolist()):
+            out[languages[group]][n][gram] = count
+    return out
+
+
+def is_sketch(freqs):
+    """True for sketch.SketchCounter tables, which keep only the most
+    frequent n-grams (their total still counts every occurrence)."""
+    return not isinstance(freqs, Counter)
+
+
+def frequency_summary(freqs, kind):
+    """Print the total and unique count of freqs; returns the total."""
+    if is_sketch(freqs):
+        total = freqs.total()
+        print(f"Total {kind} counted: {total}")
+        print(f"Unique {kind}: not tracked (the sketch keeps the "
+              f"{len(freqs)} most frequent)")
+    else:
+        total = sum(freqs.values())
+        print(f"Total {kind} counted: {total}")
+        print(f"Unique {kind}: {len(freqs)}")
+    return total
+
+
+def run_bigram_analysis(names, label="all", freqs=None):
+    if freqs is None:
+        freqs = compute_frequencies(names, n=2)
+    top20 = freqs.most_common(20)
+    hapax = [bg for bg, c in freqs.items() if c == 1]
+
+    print(f"\n{'='*50}")
+    print(f"Bigram Frequency Analysis — {label}")
+    print(f"{'='*50}")
+    total = frequency_summary(freqs, "bigrams")
+    print(f"\nTop 20 Most Frequent Bigrams:")
+    for rank, (bg, count) in enumerate(top20, 1):
+        pct = count / total * 100
+        print(f"  {rank:>2}. '{bg}' — {count} ({pct:.1f}%)")
+    if is_sketch(freqs):
+        # hapax and unobserved bigrams are the ones a sketch drops
+        return freqs, top20, [], set()
+
+    print(f"\nLeast Frequent Bigrams:")
+    print(f"  Bigrams appearing exactly once (hapax): {len(hapax)}")
+    if hapax[:10]:
+        print(f"  Examples: {hapax[:10]}")
+
+    # all possible bigrams from lowercase letters
+    alpha = string.ascii_lowercase
+    possible = {a + b for a in alpha for b in alpha}
+    unobserved = possible - set(freqs.keys())
+    print(f"  Unobserved letter-only bigrams: {len(unobserved)}")
+    if list(unobserved)[:5]:
+        print(f"  Examples: {sorted(unobserved)[:5]}")
+
+    print(f"\n  NOTE: 'Least frequent' is ambiguous —")
+    print(f"  {len(hapax)} bigrams appear once, but "
+          f"{len(unobserved)} possible bigrams never appear.")
+    print(f"  The truly 'least frequent' are the unobserved ones "
+          f"(frequency 0).")
+
+    return freqs, top20, hapax, unobserved
+
+
+def run_trigram_analysis(names, label="all", freqs=None):
+    if freqs is None:
+        freqs = compute_frequencies(names, n=3)
+    top20 = freqs.most_common(20)
+    hapax = [tg for tg, c in freqs.items() if c == 1]
+
+    print(f"\n{'='*50}")
+    print(f"Trigram Frequency Analysis — {label}")
+    print(f"{'='*50}")
+    total = frequency_summary(freqs, "trigrams")
+    print(f"\nTop 20 Most Frequent Trigrams:")
+    for rank, (tg, count) in enumerate(top20, 1):
+        pct = count / total * 100
+        print(f"  {rank:>2}. '{tg}' — {count} ({pct:.1f}%)")
+    if is_sketch(freqs):
+        return freqs, top20, []
+
+    print(f"\nTrigrams appearing exactly once: {len(hapax)}")
+    print(f"  Trigrams are sparser but more distinctive than bigrams.")
+
+    return freqs, top20, hapax
+
+
+def plot_top_ngrams(top_items, title, filename):
+    # matplotlib is only needed for the plots, not for the counting
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    labels = [bg for bg, _ in top_items]
+    counts = [c for _, c in top_items]
+
+    fig, ax = plt.subplots(figsize=(10, 5))
+    ax.barh(labels[::-1], counts[::-1], color="#4a90d9")
+    ax.set_xlabel("Frequency")
+    ax.set_title(title)
+    ax.spines["top"].set_visible(False)
+    ax.spines["right"].set_visible(False)
+    plt.tight_layout()
+    plt.savefig(os.path.join(RESULTS_DIR, filename), dpi=150)
+    plt.close()
+
+
+def _plot_job(job):
+    plot_top_ngrams(*job)
+
+
+def render_plots(jobs, workers=None):
+    """plot_top_ngrams for each (top_items, title, filename) job.
+
+    Figures are independent, so several are drawn in a process pool,
+    each worker importing matplotlib once for all of its figures.
+    """
+    from .parallel import default_workers
+
+    workers = min(workers or default_workers(), len(jobs))
+    if workers <= 1:
+        for job in jobs:
+            _plot_job(job)
+        return
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(workers) as pool:
+        list(pool.map(_plot_job, jobs))
+
+
+def save_frequency_table(freqs, filepath, parquet=False):
+    """Write freqs as ngram,count rows, most frequent first.
+
+    The whole table is built in memory and written in one call. With
+    parquet a .parquet copy is written too (needs pandas with pyarrow
+    or fastparquet).
+    """
+    sorted_freqs = sorted(freqs.items(), key=lambda x: -x[1])
+    with open(filepath, "w") as f:
+        f.write("ngram,count\n" + "".join(
+            f"{gram},{count}\n" for gram, count in sorted_freqs
+        ))
+    if parquet:
+        import pandas as pd
+
+        pd.DataFrame(sorted_freqs, columns=["ngram", "count"]).to_parquet(
+            os.path.splitext(filepath)[0] + ".parquet", index=False
+        )
+
+
+def inputs_hash(*inputs):
+    """Hash of everything an artifact is rendered from."""
+    text = json.dumps([REPORT_VERSION, *inputs], ensure_ascii=False)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class Manifest:
+    """Inputs hash and output hash of every artifact in results/.
+
+    An artifact is up to date when it was last rendered from the same
+    inputs and its file is still the one that was written then.
+    """
+
+    def __init__(self, path=MANIFEST_PATH):
+        self.path = path
+        self.entries = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                self.entries = json.load(f)
+
+    def fresh(self, filename, key):
+        from .preprocess import file_hash
+
+        entry = self.entries.get(filename)
+        path = os.path.join(RESULTS_DIR, filename)
+        fresh = (entry is not None and entry["inputs"] == key
+                 and os.path.exists(path)
+                 and entry["output"] == file_hash(path))
+        instrument.count("report_cache_hits" if fresh
+                         else "report_cache_misses")
+        return fresh
+
+    def record(self, filename, key):
+        from .preprocess import file_hash
+
+        self.entries[filename] = {
+            "inputs": key,
+            "output": file_hash(os.path.join(RESULTS_DIR, filename)),
+        }
+
+    def save(self):
+        with open(self.path, "w") as f:
+            json.dump(self.entries, f, indent=1, sort_keys=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Task 1: n-gram frequency report"
+    )
+    parser.add_argument("--workers", type=int,
+                        help="processes for rendering plots")
+    parser.add_argument("--parquet", action="store_true",
+                        help="also write each table as Parquet")
+    parser.add_argument("--force", action="store_true",
+                        help="rebuild every artifact")
+    parser.add_argument("--sketch", type=int, metavar="CAPACITY",
+                        help="count with fixed-memory Count-Min sketches, "
+                             "keeping the CAPACITY most frequent n-grams; "
+                             "tables and plots get a _sketch suffix and "
+                             "accuracy against exact counts is reported")
+    args = parser.parse_args(argv)
+
+    names, labels = load_data()
+    eng_names, rus_names = split_by_language(names, labels)
+    ensure_results_dir()
+
+    print(f"Loaded {len(names)} names "
+          f"({len(eng_names)} English, {len(rus_names)} Russian)")
+
+    # every order of every language from one encoding of the names
+    if args.sketch:
+        from .sketch import SketchCounter
+
+        counts = {
+            lang: {n: SketchCounter.from_names(group, n,
+                                               capacity=args.sketch)
+                   for n in (2, 3)}
+            for lang, group in group_by_language(names, labels).items()
+        }
+    else:
+        counts = count_all_orders(names, labels, orders=(2, 3))
+    eng_counts = counts.get("English", {2: Counter(), 3: Counter()})
+    rus_counts = counts.get("Russian", {2: Counter(), 3: Counter()})
+
+    # English bigrams
+    eng_bi, eng_top20, _, _ = run_bigram_analysis(
+        eng_names, "English", eng_counts[2]
+    )
+    # Russian bigrams
+    rus_bi, rus_top20, _, _ = run_bigram_analysis(
+        rus_names, "Russian", rus_counts[2]
+    )
+
+    # Trigram analysis
+    eng_tri, eng_tri_top, _ = run_trigram_analysis(
+        eng_names, "English", eng_counts[3]
+    )
+    rus_tri, rus_tri_top, _ = run_trigram_analysis(
+        rus_names, "Russian", rus_counts[3]
+    )
+
+    if args.sketch:
+        from .sketch import compare_counts
+
+        exact = count_all_orders(names, labels, orders=(2, 3))
+        print(f"\nSketch accuracy against exact counts (top 20):")
+        for lang, orders in counts.items():
+            for n, kind in ((2, "bigrams"), (3, "trigrams")):
+                acc = compare_counts(orders[n], exact[lang][n])
+                print(f"  {lang} {kind}: recall {acc['top_k_recall']:.0%}, "
+                      f"error max {acc['max_rel_error']:.1%} "
+                      f"mean {acc['mean_rel_error']:.1%}, kept n-grams "
+                      f"cover {acc['coverage']:.1%} of occurrences")
+
+    manifest = Manifest()
+    if args.force:
+        manifest.entries = {}
+
+    # sketch tables and plots never replace the exact ones
+    suffix = "_sketch" if args.sketch else ""
+
+    def output(filename):
+        stem, ext = os.path.splitext(filename)
+        return stem + suffix + ext
+
+    # Save tables
+    tables = [
+        (eng_bi, output("english_bigrams.csv")),
+        (rus_bi, output("russian_bigrams.csv")),
+        (eng_tri, output("english_trigrams.csv")),
+        (rus_tri, output("russian_trigrams.csv")),
+    ]
+    for freqs, filename in tables:
+        key = inputs_hash(filename, list(freqs.items()))
+        outputs = [filename]
+        if args.parquet:
+            outputs.append(os.path.splitext(filename)[0] + ".parquet")
+        if all(manifest.fresh(out, key) for out in outputs):
+            continue
+        save_frequency_table(
+            freqs, os.path.join(RESULTS_DIR, filename), args.parquet
+        )
+        for out in outputs:
+            manifest.record(out, key)
+    print("\nFrequency tables saved to results/")
+
+    # Plots
+    plots = [
+        (eng_top20, "Top 20 English Bigrams",
+         output("english_bigrams_top20.png")),
+        (rus_top20, "Top 20 Russian Bigrams",
+         output("russian_bigrams_top20.png")),
+        (eng_tri_top, "Top 20 English Trigrams",
+         output("english_trigrams_top20.png")),
+        (rus_tri_top, "Top 20 Russian Trigrams",
+         output("russian_trigrams_top20.png")),
+    ]
+    keys = {job[2]: inputs_hash(*job) for job in plots}
+    stale = [job for job in plots if not manifest.fresh(job[2], keys[job[2]])]
+    render_plots(stale, args.workers)
+    rendered = {job[2] for job in stale}
+    for _, _, filename in plots:
+        if filename in rendered:
+            manifest.record(filename, keys[filename])
+            print(f"  Plot saved: results/{filename}")
+        else:
+            print(f"  Plot up to date: results/{filename}")
+    manifest.save()
+
+
+if __name__ == "__main__":
+    main()
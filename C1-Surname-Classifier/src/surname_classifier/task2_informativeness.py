@@ -0,0 +1,81 @@
+import os
+
+import numpy as np
+
+from .ranking import count_matrix, rank, score_ngrams
+from .utils import (
+    load_data, split_by_language, ensure_results_dir, RESULTS_DIR
+)
+
+
+def main():
+    names, labels = load_data()
+    eng_names, rus_names = split_by_language(names, labels)
+    ensure_results_dir()
+
+    bigrams, counts = count_matrix([eng_names, rus_names], n=2)
+    metrics = score_ngrams(counts)
+    eng_pct, rus_pct = metrics["freqs"] * 100
+    scores = metrics["abs_diff"]
+    # ties in score are ordered by bigram, so reruns rank identically
+    ranked = rank(scores)
+
+    print("="*50)
+    print("Task 2: Least Informative Bigrams")
+    print("="*50)
+
+    print("\n20 Least Informative Bigrams (lowest score):")
+    print(f"{'Rank':<5} {'Bigram':<8} {'Score':<10} "
+          f"{'Eng Freq':<10} {'Rus Freq':<10}")
+    print("-" * 43)
+    for i, j in enumerate(ranked[:20], 1):
+        print(f"{i:<5} '{bigrams[j]}'    {scores[j]:.6f}  "
+              f"{eng_pct[j]:.2f}%      {rus_pct[j]:.2f}%")
+
+    first = ranked[0]
+    print(f"\nLeast informative bigram: '{bigrams[first]}' "
+          f"(score: {scores[first]:.6f})")
+    print("This bigram appears at nearly the same frequency "
+          "in both languages,")
+    print("making it a poor discriminator for classification.")
+
+    print("\n20 Most Informative Bigrams (highest score):")
+    print(f"{'Rank':<5} {'Bigram':<8} {'Score':<10} "
+          f"{'Eng Freq':<10} {'Rus Freq':<10}")
+    print("-" * 43)
+    for i, j in enumerate(ranked[::-1][:20], 1):
+        print(f"{i:<5} '{bigrams[j]}'    {scores[j]:.6f}  "
+              f"{eng_pct[j]:.2f}%      {rus_pct[j]:.2f}%")
+
+    # the other metrics weigh in how much evidence each count carries
+    print("\nMost Informative Bigrams by Other Metrics:")
+    print(f"{'Rank':<5} {'Log-odds (z)':<18} {'Mutual info':<18} "
+          f"{'Chi-squared':<18}")
+    print("-" * 59)
+    by_metric = [
+        np.abs(metrics["log_odds"][1]), metrics["mutual_information"],
+        metrics["chi_squared"],
+    ]
+    tops = [rank(m, descending=True)[:10] for m in by_metric]
+    for i in range(10):
+        cells = [f"'{bigrams[top[i]]}' {m[top[i]]:<11.4g}"
+                 for top, m in zip(tops, by_metric)]
+        print(f"{i + 1:<5} " + " ".join(f"{c:<18}" for c in cells))
+
+    # save results
+    outpath = os.path.join(RESULTS_DIR, "task2_informativeness.csv")
+    with open(outpath, "w") as f:
+        f.write("bigram,score,eng_pct,rus_pct,log_odds_rus,"
+                "mutual_info,chi_squared\n")
+        f.writelines(
+            f"{bigrams[j]},{scores[j]:.6f},{eng_pct[j]:.2f},"
+            f"{rus_pct[j]:.2f},{metrics['log_odds'][1, j]:.4f},"
+            f"{metrics['mutual_information'][j]:.6g},"
+            f"{metrics['chi_squared'][j]:.4f}\n"
+            for j in ranked
+        )
+    print(f"\nFull results saved to results/task2_informativeness.csv")
+
+
+if __name__ == "__main__":
+    main()
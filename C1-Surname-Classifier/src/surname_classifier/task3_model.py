@@ -1,20 +1,22 @@
 import numpy as np
 from sklearn.model_selection import train_test_split
 
-from utils import load_data
-from classifier import (
-    build_vectorizer, train_logistic, evaluate
-)
+from .utils import load_data
+from .classifier import train_logistic, evaluate
+from .feature_cache import load_index
+from .logistic import LogisticModel
 
 
 def main():
     names, labels = load_data()
     labels_arr = np.array(labels)
+    # n-grams of every name, encoded once (and cached)
+    index = load_index(names)
 
     # 80/20 stratified split
-    X_train_names, X_test_names, y_train, y_test = (
+    train_rows, _, X_train_names, X_test_names, y_train, y_test = (
         train_test_split(
-            names, labels_arr, test_size=0.2,
+            np.arange(len(names)), names, labels_arr, test_size=0.2,
             random_state=42, stratify=labels_arr
         )
     )
@@ -23,13 +25,12 @@ def main():
     print(f"Test set:     {len(X_test_names)} names")
 
     # bigram features
-    vectorizer, X_train = build_vectorizer(
-        X_train_names, ngram_range=(2, 2)
-    )
-    X_test = vectorizer.transform(X_test_names)
-
+    vocabulary, X_train = index.feature_matrix(train_rows, (2, 2))
     model = train_logistic(X_train, y_train)
-    y_pred = model.predict(X_test)
+    # predict with the exported numpy kernel (same predictions)
+    y_pred = LogisticModel.from_features(vocabulary, model).predict(
+        X_test_names
+    )
 
     metrics = evaluate(
         y_test, y_pred,
@@ -37,12 +38,11 @@ def main():
     )
 
     # bigram + trigram features
-    vec_23, X_train_23 = build_vectorizer(
-        X_train_names, ngram_range=(2, 3)
-    )
-    X_test_23 = vec_23.transform(X_test_names)
+    vocab_23, X_train_23 = index.feature_matrix(train_rows, (2, 3))
     model_23 = train_logistic(X_train_23, y_train)
-    y_pred_23 = model_23.predict(X_test_23)
+    y_pred_23 = LogisticModel.from_features(
+        vocab_23, model_23, (2, 3)
+    ).predict(X_test_names)
 
     metrics_23 = evaluate(
         y_test, y_pred_23,
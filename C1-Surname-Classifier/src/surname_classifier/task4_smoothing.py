@@ -0,0 +1,272 @@
+from collections import Counter
+import numpy as np
+
+from . import instrument
+from .bigram_lm import BigramLM, score_batch
+from .count_store import CountStore, save_counts
+from .ngram_lm import METHODS, NgramLM
+from .ngrams import Alphabet
+from .utils import (
+    load_data, compute_frequencies, group_by_language, split_by_language
+)
+
+
+@instrument.timed("count_lm")
+def count_lm(names, workers=None):
+    """Bigram and context counts for build_lm."""
+    bigram_counts = compute_frequencies(names, n=2, workers=workers)
+    # every character of a name that yields at least one bigram
+    unigram_counts = compute_frequencies(
+        [name for name in names if len(name) >= 2], n=1, workers=workers
+    )
+    return bigram_counts, unigram_counts
+
+
+@instrument.timed("build_lm")
+def build_lm_from_counts(bigram_counts, unigram_counts, k=1.0,
+                         alphabet=None):
+    return BigramLM.from_counts(
+        bigram_counts, unigram_counts, k=k, alphabet=alphabet
+    )
+
+
+def build_lm(names, k=1.0, alphabet=None, workers=None):
+    """Build a character bigram language model with add-k smoothing."""
+    return build_lm_from_counts(
+        *count_lm(names, workers), k=k, alphabet=alphabet
+    )
+
+
+def build_lm_stream(batches, k=1.0):
+    """build_lm over an iterable of name batches (see iter_names)."""
+    bigram_counts, unigram_counts = Counter(), Counter()
+    for names in batches:
+        bigrams, unigrams = count_lm(names)
+        bigram_counts.update(bigrams)
+        unigram_counts.update(unigrams)
+    return build_lm_from_counts(bigram_counts, unigram_counts, k=k)
+
+
+def load_lm(bigram_path, unigram_path, k=1.0):
+    """build_lm from count stores written with save_counts."""
+    return build_lm_from_counts(
+        CountStore(bigram_path), CountStore(unigram_path), k=k
+    )
+
+
+def save_lm_counts(names, bigram_path, unigram_path):
+    bigram_counts, unigram_counts = count_lm(names)
+    save_counts(bigram_path, bigram_counts)
+    save_counts(unigram_path, unigram_counts)
+
+
+@instrument.timed("build_ngram_lm")
+def build_ngram_lm(names, order=3, method="kneser_ney", counter=None):
+    """Order 1..5 backoff LM (kneser_ney, katz or stupid_backoff).
+
+    counter replaces exact counting, e.g. with a fixed-memory
+    functools.partial(sketch.sketch_orders, capacity=...).
+    """
+    return NgramLM.from_names(names, order, method, counter=counter)
+
+
+def score_name(name, lm):
+    """Log probability of a name under a language model.
+
+    When instrumented, bigrams the model never counted are tallied as
+    unseen_bigram_fallbacks: their probability comes from smoothing
+    alone.
+    """
+    if instrument.ENABLED:
+        instrument.count("names_scored")
+        if isinstance(lm, BigramLM):
+            codes = lm.encode(name)
+            unseen = lm.counts[codes[:-1], codes[1:]] == 0
+            instrument.count("unseen_bigram_fallbacks",
+                             int(np.count_nonzero(unseen)))
+    return lm.score(name)
+
+
+def count_unseen(names, lm):
+    """Bigrams of names that a BigramLM never counted."""
+    codes, lengths = lm.encode_batch(names)
+    inside = np.arange(codes.shape[1] - 1) < lengths[:, None] - 1
+    unseen = lm.counts[codes[:, :-1], codes[:, 1:]] == 0
+    return int(np.count_nonzero(inside & unseen))
+
+
+def classify_name(name, eng_lm, rus_lm):
+    eng_score = score_name(name, eng_lm)
+    rus_score = score_name(name, rus_lm)
+    return "English" if eng_score > rus_score else "Russian"
+
+
+def build_lms(names, labels, k=1.0, alphabet=None, languages=None):
+    """{language: add-k LM} for every language in labels.
+
+    All LMs share one alphabet, so classify_languages can stack them.
+    """
+    if alphabet is None:
+        alphabet = Alphabet("".join(names).lower())
+    groups = group_by_language(names, labels, languages)
+    return {lang: build_lm(group, k=k, alphabet=alphabet)
+            for lang, group in groups.items()}
+
+
+def score_languages(names, lms, workers=None):
+    """(L, m) log probabilities of names under each LM in {language: LM}."""
+    models = list(lms.values())
+    if workers is not None and workers > 1:
+        from .parallel import parallel_score_batch
+        return parallel_score_batch(models, names, workers)
+    if all(isinstance(lm, BigramLM) for lm in models):
+        return score_batch(models, names)
+    return np.stack([lm.score_batch(names) for lm in models])
+
+
+def classify_languages(names, lms, workers=None):
+    """Most likely language of each name under {language: LM}.
+
+    BigramLMs sharing an alphabet are scored with one gather on their
+    stacked tables and labelled by an argmax over the language axis;
+    ties go to the language listed first.
+    """
+    languages = np.array(list(lms))
+    with instrument.timer("classify_languages"):
+        scores = score_languages(names, lms, workers)
+    if instrument.ENABLED:
+        instrument.count("names_scored", scores.shape[1])
+        for lm in lms.values():
+            if isinstance(lm, BigramLM):
+                instrument.count("unseen_bigram_fallbacks",
+                                 count_unseen(names, lm))
+    return languages[scores.argmax(axis=0)]
+
+
+def classify_batch(names, eng_lm, rus_lm, workers=None):
+    """classify_name over many names in one vectorized call.
+
+    Both LMs should share an alphabet (see build_lm) so the names are
+    encoded once and scored against both tables together. With workers
+    the batch is split across that many processes.
+    """
+    # Russian first: classify_name also gives ties to Russian
+    return classify_languages(
+        names, {"Russian": rus_lm, "English": eng_lm}, workers
+    )
+
+
+def classify_ngram_batch(names, eng_lm, rus_lm):
+    """classify_batch for NgramLMs, which each encode names themselves."""
+    return classify_languages(names, {"Russian": rus_lm, "English": eng_lm})
+
+
+def main():
+    from sklearn.model_selection import train_test_split
+    from .feature_cache import load_index
+
+    names, labels = load_data()
+    labels_arr = np.array(labels)
+    index = load_index(names)
+
+    train_rows, _, X_train_names, X_test_names, y_train, y_test = (
+        train_test_split(
+            np.arange(len(names)), names, labels_arr, test_size=0.2,
+            random_state=42, stratify=labels_arr
+        )
+    )
+
+    eng_train = [n for n, l in zip(X_train_names, y_train)
+                 if l == "English"]
+    rus_train = [n for n, l in zip(X_train_names, y_train)
+                 if l == "Russian"]
+
+    k_values = [0.01, 0.1, 0.5, 1.0, 2.0]
+
+    print("="*55)
+    print("Task 4: Smoothing & Backoff (LM Approach)")
+    print("="*55)
+
+    # baseline: no smoothing (k very small)
+    # one alphabet for both LMs, so test names are encoded only once
+    alphabet = Alphabet("".join(X_train_names).lower())
+
+    # count once, from the shared n-gram index; every k below is
+    # derived from the same counts
+    eng_counts = index.lm_counts(train_rows[y_train == "English"])
+    rus_counts = index.lm_counts(train_rows[y_train == "Russian"])
+
+    eng_lm_base = build_lm_from_counts(*eng_counts, k=1e-10,
+                                       alphabet=alphabet)
+    rus_lm_base = build_lm_from_counts(*rus_counts, k=1e-10,
+                                       alphabet=alphabet)
+    base_preds = classify_batch(X_test_names, eng_lm_base, rus_lm_base)
+
+    from sklearn.metrics import (
+        precision_score, recall_score, f1_score,
+        classification_report
+    )
+
+    print("\nBaseline (no smoothing):")
+    print(classification_report(y_test, base_preds))
+    base_p = precision_score(y_test, base_preds,
+                             pos_label="Russian")
+    base_r = recall_score(y_test, base_preds,
+                          pos_label="Russian")
+    base_f = f1_score(y_test, base_preds,
+                      pos_label="Russian")
+
+    print(f"\nSmoothing Method: Add-k Smoothing")
+    print(f"Equation: P(w_i|w_{{i-1}}) = "
+          f"(C(w_{{i-1}},w_i) + k) / (C(w_{{i-1}}) + k*V)")
+
+    best_k, best_f1 = None, 0
+    results = []
+
+    for k in k_values:
+        eng_lm = build_lm_from_counts(*eng_counts, k=k, alphabet=alphabet)
+        rus_lm = build_lm_from_counts(*rus_counts, k=k, alphabet=alphabet)
+        preds = classify_batch(X_test_names, eng_lm, rus_lm)
+        p = precision_score(y_test, preds, pos_label="Russian")
+        r = recall_score(y_test, preds, pos_label="Russian")
+        f = f1_score(y_test, preds, pos_label="Russian")
+        results.append((k, p, r, f))
+        if f > best_f1:
+            best_f1 = f
+            best_k = k
+
+    print(f"\nResults across k values:")
+    print(f"{'k':<8} {'Precision':<12} {'Recall':<12} {'F1':<12}")
+    print("-" * 44)
+    for k, p, r, f in results:
+        print(f"{k:<8} {p:<12.4f} {r:<12.4f} {f:<12.4f}")
+
+    print(f"\nBest k = {best_k}")
+
+    print(f"\nComparison:")
+    print(f"{'Metric':<12} {'Baseline':<12} "
+          f"{'Smoothed(k=' + str(best_k) + ')':<20}")
+    print("-" * 44)
+    best_res = [r for r in results if r[0] == best_k][0]
+    print(f"{'Precision':<12} {base_p:<12.4f} {best_res[1]:<20.4f}")
+    print(f"{'Recall':<12} {base_r:<12.4f} {best_res[2]:<20.4f}")
+    print(f"{'F1':<12} {base_f:<12.4f} {best_res[3]:<20.4f}")
+
+    print("\nBackoff across n-gram orders (^/$ padded):")
+    print(f"{'Method':<16} {'Order':<7} {'Precision':<12} {'Recall':<12} "
+          f"{'F1':<12}")
+    print("-" * 59)
+    for method in METHODS:
+        for order in (2, 3, 4, 5):
+            eng_lm = build_ngram_lm(eng_train, order, method)
+            rus_lm = build_ngram_lm(rus_train, order, method)
+            preds = classify_ngram_batch(X_test_names, eng_lm, rus_lm)
+            p = precision_score(y_test, preds, pos_label="Russian")
+            r = recall_score(y_test, preds, pos_label="Russian")
+            f = f1_score(y_test, preds, pos_label="Russian")
+            print(f"{method:<16} {order:<7} {p:<12.4f} {r:<12.4f} "
+                  f"{f:<12.4f}")
+
+
+if __name__ == "__main__":
+    main()
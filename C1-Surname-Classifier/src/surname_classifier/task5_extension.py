@@ -6,8 +6,11 @@ from sklearn.metrics import (
     classification_report
 )
 
-from utils import load_data, ensure_results_dir, RESULTS_DIR
-from classifier import build_vectorizer, train_logistic
+from .utils import load_data, ensure_results_dir, RESULTS_DIR
+from .classifier import train_logistic
+from .feature_cache import load_index
+from .logistic import LogisticModel
+from .preprocess import find_leakage, name_key, normalize_name
 
 
 # additional English names for data extension
@@ -59,28 +62,26 @@ EXTRA_ENGLISH = [
     "Watkins", "Wheeler", "Larson", "Carlson", "Harper",
 ]
 
-EXTRA_ENGLISH_LABELS = ["English"] * len(EXTRA_ENGLISH)
-
 
 def main():
     names, labels = load_data()
     labels_arr = np.array(labels)
     ensure_results_dir()
+    index = load_index(names)
 
-    X_train_orig, X_test, y_train_orig, y_test = (
+    train_rows, _, X_train_orig, X_test, y_train_orig, y_test = (
         train_test_split(
-            names, labels_arr, test_size=0.2,
+            np.arange(len(names)), names, labels_arr, test_size=0.2,
             random_state=42, stratify=labels_arr
         )
     )
 
     # baseline on original
-    vec_orig, X_tr_orig = build_vectorizer(
-        X_train_orig, ngram_range=(2, 2)
-    )
-    X_te_orig = vec_orig.transform(X_test)
+    vocab_orig, X_tr_orig = index.feature_matrix(train_rows, (2, 2))
     model_orig = train_logistic(X_tr_orig, y_train_orig)
-    y_pred_orig = model_orig.predict(X_te_orig)
+    y_pred_orig = LogisticModel.from_features(
+        vocab_orig, model_orig
+    ).predict(X_test)
 
     p_orig = precision_score(y_test, y_pred_orig,
                              pos_label="Russian")
@@ -89,16 +90,24 @@ def main():
     f_orig = f1_score(y_test, y_pred_orig,
                       pos_label="Russian")
 
-    # extended training set
-    X_train_ext = list(X_train_orig) + EXTRA_ENGLISH
-    y_train_ext = list(y_train_orig) + EXTRA_ENGLISH_LABELS
-
-    vec_ext, X_tr_ext = build_vectorizer(
-        X_train_ext, ngram_range=(2, 2)
+    # extended training set, minus extra names that are already in
+    # the test split (leakage) or in the training split (duplicates)
+    leaked = set(find_leakage(EXTRA_ENGLISH, X_test))
+    excluded = leaked | {name_key(n) for n in X_train_orig}
+    extra = [n for n in dict.fromkeys(map(normalize_name, EXTRA_ENGLISH))
+             if name_key(n) not in excluded]
+    X_train_ext = list(X_train_orig) + extra
+    y_train_ext = list(y_train_orig) + ["English"] * len(extra)
+
+    # only the extra names are encoded; the training rows are reused
+    extra_rows = index.append(extra)
+    vocab_ext, X_tr_ext = index.feature_matrix(
+        np.concatenate([train_rows, extra_rows]), (2, 2)
     )
-    X_te_ext = vec_ext.transform(X_test)
     model_ext = train_logistic(X_tr_ext, y_train_ext)
-    y_pred_ext = model_ext.predict(X_te_ext)
+    y_pred_ext = LogisticModel.from_features(
+        vocab_ext, model_ext
+    ).predict(X_test)
 
     p_ext = precision_score(y_test, y_pred_ext,
                             pos_label="Russian")
@@ -115,7 +124,13 @@ def main():
     print(f"  Size: {len(EXTRA_ENGLISH)} additional English names")
     print(f"  Rationale: Official census data, diverse English "
           f"surname patterns")
-    print(f"  Preprocessing: No filtering, already clean")
+    print(f"  Preprocessing: normalized, deduplicated against the "
+          f"training split")
+    print(f"  Overlap with test split: {len(leaked)} names removed "
+          f"(leakage)")
+    print(f"  Overlap with training split: "
+          f"{len(EXTRA_ENGLISH) - len(leaked) - len(extra)} names removed")
+    print(f"  Added: {len(extra)} names")
 
     print(f"\nOriginal training: {len(X_train_orig)} names")
     print(f"Extended training: {len(X_train_ext)} names")
@@ -145,7 +160,8 @@ def main():
     outpath = os.path.join(RESULTS_DIR, "task5_comparison.txt")
     with open(outpath, "w") as f:
         f.write("Task 5: Extended Data Results\n")
-        f.write(f"Extra names: {len(EXTRA_ENGLISH)}\n")
+        f.write(f"Extra names: {len(extra)} of {len(EXTRA_ENGLISH)} "
+                f"({len(leaked)} in the test split)\n")
         f.write(f"Original P={p_orig:.4f} R={r_orig:.4f} "
                 f"F1={f_orig:.4f}\n")
         f.write(f"Extended P={p_ext:.4f} R={r_ext:.4f} "
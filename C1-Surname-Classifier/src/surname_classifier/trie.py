@@ -0,0 +1,243 @@
+from collections import Counter
+
+import numpy as np
+
+from .artifact import load_artifact, save_artifact
+from .ngrams import Alphabet, encode_corpus, ngram_ids
+
+
+def smallest_uint(top):
+    """Narrowest unsigned dtype that holds values up to top."""
+    for dtype in (np.uint8, np.uint16, np.uint32):
+        if top <= np.iinfo(dtype).max:
+            return dtype
+    return np.uint64
+
+
+class NgramTrie:
+    """Character trie over n-gram counts of every order, held in arrays.
+
+    Nodes are numbered level by level (root = 0, then every 1-gram,
+    every 2-gram, ...) and in lexicographic order within a level, so the
+    children of node i are the run child_start[i]:child_start[i + 1],
+    sorted by label. counts[i] is the count of the n-gram spelled by the
+    path to node i (0 for nodes that only exist as prefixes). A lookup
+    is one binary search per character, and every subtree is one
+    contiguous range per level.
+    """
+
+    def __init__(self, alphabet, labels, counts, child_start, levels):
+        self.alphabet = alphabet
+        self.labels = labels
+        self.counts = counts
+        self.child_start = child_start
+        # levels[d] is the first node of depth d; levels[-1] the total
+        self.levels = levels
+        self.order = len(levels) - 2
+
+    @classmethod
+    def from_level_ids(cls, alphabet, level_ids, level_counts):
+        """Build from the sorted packed ids and counts of depths 1..n.
+
+        The prefix (id // base) of every id must be on the level above.
+        """
+        base = max(alphabet.size, 1)
+        levels = np.cumsum([0, 1] + [len(ids) for ids in level_ids])
+        total = int(levels[-1])
+        labels = np.zeros(total, dtype=smallest_uint(base))
+        counts = np.zeros(total, dtype=np.int64)
+        child_start = np.full(total + 1, total, dtype=np.int64)
+        parents = np.zeros(1, dtype=np.int64)
+        for depth, (ids, values) in enumerate(zip(level_ids, level_counts)):
+            start, stop = levels[depth + 1], levels[depth + 2]
+            labels[start:stop] = ids % base
+            counts[start:stop] = values
+            child_start[levels[depth]:start] = start + np.searchsorted(
+                ids // base, parents
+            )
+            parents = ids
+        top = int(counts.max()) if total else 0
+        return cls(alphabet, labels, counts.astype(smallest_uint(top)),
+                   child_start.astype(smallest_uint(total)), levels)
+
+    @classmethod
+    def from_names(cls, names, order=5, pad=False):
+        """Count every n-gram of order 1..order into one trie.
+
+        Level n holds exactly compute_frequencies(names, n, pad); padded
+        prefixes such as "^^" that are not n-grams of their own order
+        become count-0 internal nodes.
+        """
+        names = list(names)
+        _, alphabet = encode_corpus(names, order, pad)
+        base = max(alphabet.size, 1)
+        level_ids, level_counts = [None] * order, [None] * order
+        below = np.zeros(0, dtype=np.int64)
+        for n in range(order, 0, -1):
+            ids, _ = ngram_ids(names, n, pad, alphabet)
+            ids, values = np.unique(ids, return_counts=True)
+            merged = np.union1d(ids, below)
+            counts = np.zeros(len(merged), dtype=np.int64)
+            counts[np.searchsorted(merged, ids)] = values
+            level_ids[n - 1], level_counts[n - 1] = merged, counts
+            below = np.unique(merged // base)
+        return cls.from_level_ids(alphabet, level_ids, level_counts)
+
+    @classmethod
+    def from_sorted(cls, items, alphabet=None):
+        """Build from (gram, count) pairs sorted by gram, in one pass.
+
+        Meant for streams that are already ordered, such as the merge
+        output of an external sort: only the packed ids of each level
+        are buffered. Grams of any length may be mixed; missing
+        prefixes become count-0 nodes. Without an alphabet the items
+        are read into memory first to collect their characters.
+        """
+        if alphabet is None:
+            items = list(items)
+            alphabet = Alphabet("".join(gram for gram, _ in items))
+        base = max(alphabet.size, 1)
+        level_ids, level_counts = [], []
+        path, previous = [], None
+        for gram, count in items:
+            if not gram:
+                raise ValueError("cannot store an empty gram")
+            if previous is not None and gram <= previous:
+                raise ValueError(f"grams must be strictly sorted: "
+                                 f"{previous!r} then {gram!r}")
+            codes = alphabet.encode(gram).tolist()
+            if -1 in codes:
+                raise ValueError(f"{gram!r} has characters outside "
+                                 f"the alphabet")
+            shared = 0
+            while shared < len(path) and path[shared] == codes[shared]:
+                shared += 1
+            del path[shared:]
+            packed = 0
+            for depth, code in enumerate(codes):
+                packed = packed * base + code
+                if depth < shared:
+                    continue
+                if depth == len(level_ids):
+                    level_ids.append([])
+                    level_counts.append([])
+                level_ids[depth].append(packed)
+                level_counts[depth].append(0)
+                path.append(code)
+            # a sorted stream always creates the gram's own node last
+            level_counts[len(codes) - 1][-1] = count
+            previous = gram
+        return cls.from_level_ids(
+            alphabet,
+            [np.array(ids, dtype=np.int64) for ids in level_ids],
+            [np.array(c, dtype=np.int64) for c in level_counts],
+        )
+
+    @classmethod
+    def from_counts(cls, counts):
+        """Build from a Counter of grams (of any lengths)."""
+        return cls.from_sorted(sorted(counts.items()))
+
+    def node(self, gram):
+        """Index of the node spelling gram, or -1."""
+        node = 0
+        for char in gram:
+            code = self.alphabet.index(char)
+            if code < 0:
+                return -1
+            lo = int(self.child_start[node])
+            hi = int(self.child_start[node + 1])
+            pos = lo + int(np.searchsorted(self.labels[lo:hi], code))
+            if pos == hi or self.labels[pos] != code:
+                return -1
+            node = pos
+        return node
+
+    def get(self, gram, default=0):
+        node = self.node(gram)
+        count = int(self.counts[node]) if node > 0 else 0
+        return count if count else default
+
+    def __getitem__(self, gram):
+        return self.get(gram, 0)
+
+    def __contains__(self, gram):
+        return bool(self.get(gram, 0))
+
+    def __len__(self):
+        return int(np.count_nonzero(self.counts))
+
+    def continuations(self, prefix):
+        """{next char: count of prefix + char} for one prefix.
+
+        Like items(), only stored grams are listed: prefix-only nodes
+        (count 0) are left out.
+        """
+        node = self.node(prefix)
+        if node < 0:
+            return {}
+        lo = int(self.child_start[node])
+        hi = int(self.child_start[node + 1])
+        counts = self.counts[lo:hi]
+        keep = counts > 0
+        chars = self.alphabet.decode(self.labels[lo:hi][keep, None])
+        return dict(zip(chars, counts[keep].tolist()))
+
+    def _descend(self, node):
+        """(codes, counts) of each level below node, in sorted order.
+
+        codes is an (m, depth) matrix of the labels on the way down from
+        node, built one column per level.
+        """
+        codes = np.zeros((1, 0), dtype=np.int64)
+        lo, hi = node, node + 1
+        while True:
+            starts = self.child_start[lo:hi + 1].astype(np.int64)
+            if starts[-1] == starts[0]:
+                return
+            parents = np.repeat(np.arange(hi - lo), np.diff(starts))
+            lo, hi = int(starts[0]), int(starts[-1])
+            codes = np.column_stack([codes[parents], self.labels[lo:hi]])
+            yield codes, self.counts[lo:hi]
+
+    def items(self, prefix=""):
+        """Sorted (gram, count) of every stored gram starting with prefix.
+
+        Enumerating a subtree costs one vectorized step per level.
+        """
+        node = self.node(prefix)
+        if node < 0:
+            return []
+        out = []
+        if node > 0 and self.counts[node]:
+            out.append((prefix, int(self.counts[node])))
+        for codes, counts in self._descend(node):
+            keep = counts > 0
+            suffixes = self.alphabet.decode(codes[keep])
+            out.extend((prefix + s, c)
+                       for s, c in zip(suffixes, counts[keep].tolist()))
+        return sorted(out)
+
+    def counter(self, n):
+        """Level n as a Counter: compute_frequencies counts, sorted."""
+        for depth, (codes, counts) in enumerate(self._descend(0), 1):
+            if depth == n:
+                keep = counts > 0
+                grams = self.alphabet.decode(codes[keep])
+                return Counter(dict(zip(grams, counts[keep].tolist())))
+        return Counter()
+
+    def save(self, path):
+        meta = {"alphabet": self.alphabet.chars}
+        save_artifact(path, "ngram_trie", meta, {
+            "labels": self.labels, "counts": self.counts,
+            "child_start": self.child_start,
+            "levels": np.asarray(self.levels, dtype=np.int64),
+        })
+
+    @classmethod
+    def load(cls, path, mmap=True, verify=True):
+        meta, arrays = load_artifact(path, "ngram_trie", mmap, verify)
+        return cls(Alphabet(meta["alphabet"]), arrays["labels"],
+                   arrays["counts"], arrays["child_start"],
+                   np.asarray(arrays["levels"]))
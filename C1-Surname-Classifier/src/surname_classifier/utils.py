@@ -0,0 +1,156 @@
+import os
+from collections import Counter
+
+from . import instrument
+from .ngrams import count_ngrams, pad_name
+
+
+# the checkout this package sits in, as src/surname_classifier/
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__)
+)))
+DATA_DIR = os.path.join(PROJECT_DIR, "data")
+RESULTS_DIR = os.path.join(PROJECT_DIR, "results")
+
+
+BATCH_SIZE = 10000
+
+# labels kept by default; languages=None keeps every label in the file
+LANGUAGES = ("English", "Russian")
+
+# scraped page furniture that appears in the data as names
+NOISE = {"To The First Page"}
+
+
+def parse_line(line, languages=LANGUAGES, keep_spaces=False):
+    """(name, lang) for a usable data line, otherwise None.
+
+    Names containing spaces are skipped unless keep_spaces, which the
+    cleaning pipeline uses to normalize them instead; known NOISE
+    entries are always skipped.
+    """
+    line = line.strip().replace("\r", "")
+    if not line:
+        return None
+    parts = [p for p in line.split(",") if p.strip()]
+    if len(parts) < 2:
+        return None
+    name, lang = parts[0].strip(), parts[-1].strip()
+    if languages is not None and lang not in languages:
+        return None
+    # skip noise entries
+    if name in NOISE or (" " in name and not keep_spaces):
+        return None
+    return name, lang
+
+
+def iter_batches(filepath=None, batch_size=BATCH_SIZE, languages=LANGUAGES,
+                 keep_spaces=False):
+    """Yield (names, labels) lists of at most batch_size entries.
+
+    The file is read line by line, so memory is bounded by the batch
+    size rather than by the size of the file.
+    """
+    if filepath is None:
+        filepath = os.path.join(DATA_DIR, "Russian-and-English-dev.txt")
+    names, labels = [], []
+    with open(filepath, "r", encoding="utf-8") as f:
+        for line in f:
+            entry = parse_line(line, languages, keep_spaces)
+            if entry is None:
+                continue
+            names.append(entry[0])
+            labels.append(entry[1])
+            if len(names) >= batch_size:
+                yield names, labels
+                names, labels = [], []
+    if names:
+        yield names, labels
+
+
+def iter_names(filepath=None, lang=None, batch_size=BATCH_SIZE,
+               languages=LANGUAGES):
+    """Yield batches of names, optionally only those labelled lang."""
+    if lang is not None:
+        languages = None
+    for names, labels in iter_batches(filepath, batch_size, languages):
+        if lang is not None:
+            names = [n for n, l in zip(names, labels) if l == lang]
+        if names:
+            yield names
+
+
+@instrument.timed("load_data")
+def load_data(filepath=None, languages=LANGUAGES, clean=False, bloom=None):
+    """(names, labels) of a data file.
+
+    With clean the names are normalized and deduplicated first, and
+    the result is cached on disk (see preprocess.load_corpus); bloom
+    deduplicates through a Bloom filter sized for that many names.
+    """
+    if clean:
+        from .preprocess import load_corpus
+        corpus = load_corpus(filepath, languages, bloom=bloom)
+        instrument.count("names_loaded", len(corpus.names))
+        return corpus.names, corpus.labels
+    names, labels = [], []
+    for batch_names, batch_labels in iter_batches(filepath,
+                                                  languages=languages):
+        names.extend(batch_names)
+        labels.extend(batch_labels)
+    instrument.count("names_loaded", len(names))
+    return names, labels
+
+
+def extract_ngrams(name, n=2, pad=False):
+    name = name.lower()
+    if pad:
+        name = pad_name(name, n)
+    return [name[i:i + n] for i in range(len(name) - n + 1)]
+
+
+def compute_frequencies(names, n=2, pad=False, workers=None):
+    # same counts as feeding extract_ngrams into a Counter, but
+    # computed over integer-encoded names in one vectorized pass
+    if workers is not None and workers > 1:
+        from .parallel import parallel_frequencies
+        return parallel_frequencies(names, n, pad, workers)
+    return count_ngrams(names, n, pad)
+
+
+def compute_frequencies_stream(batches, n=2, pad=False):
+    """compute_frequencies over an iterable of name batches."""
+    counts = Counter()
+    for names in batches:
+        counts.update(count_ngrams(names, n, pad))
+    return counts
+
+
+def split_by_language(names, labels):
+    eng, rus = [], []
+    for name, lang in zip(names, labels):
+        if lang == "English":
+            eng.append(name)
+        else:
+            rus.append(name)
+    return eng, rus
+
+
+def group_by_language(names, labels, languages=None):
+    """{language: names} for any number of labels.
+
+    Languages come in the given order, otherwise in order of first
+    appearance; listed languages with no names map to empty lists.
+    """
+    groups = {lang: [] for lang in languages or ()}
+    for name, lang in zip(names, labels):
+        if languages is None:
+            groups.setdefault(lang, [])
+        elif lang not in groups:
+            continue
+        groups[lang].append(name)
+    return groups
+
+
+def ensure_results_dir():
+    os.makedirs(RESULTS_DIR, exist_ok=True)